@@ -0,0 +1,167 @@
+import hashlib
+from array import array
+from collections import deque
+
+import numpy as np
+
+# A CompiledDFA is the logical part of a machine flattened into arrays.
+# States are numbered by a breadth first search from the initial state that
+# follows transitions in sorted symbol order, so two machines with the same
+# structure compile to the same table no matter what order their nodes were
+# created in or where they sit on the canvas. Unreachable states are dropped,
+# they can't affect what the machine accepts.
+
+
+class CompiledDFA:
+    NO_TRANSITION = -1
+
+    def __init__(
+        self,
+        alphabet: tuple,
+        table: np.ndarray,
+        finals: np.ndarray,
+        state_ids: np.ndarray = None,
+    ):
+        self.alphabet = alphabet  # sorted tuple of transition labels
+        self.symbol_index = {symbol: i for i, symbol in enumerate(alphabet)}
+        self.table = table  # int32 (states, symbols), NO_TRANSITION if missing
+        self.finals = finals  # bool (states,)
+        # the MachineStore id of each state, if it was compiled from one
+        self.state_ids = state_ids
+        self._hash = None
+
+    @classmethod
+    def from_store(cls, store, initial: int) -> "CompiledDFA":
+        """Compiles the machine reachable from state id initial in a MachineStore."""
+        if initial is None:
+            return cls(
+                (), np.zeros((0, 0), np.int32), np.zeros(0, bool), np.zeros(0, np.intp)
+            )
+
+        n_symbols = len(store.symbols)
+        transitions = store.transitions[: store.count, :n_symbols]
+        live = transitions != cls.NO_TRANSITION
+
+        # canonical numbering, visiting columns in sorted symbol order
+        columns = sorted(range(n_symbols), key=store.symbols.__getitem__)
+        numbering = np.full(store.count, cls.NO_TRANSITION, np.int32)
+        numbering[initial] = 0
+        order = [initial]
+        queue = deque(order)
+        while queue:
+            i = queue.popleft()
+            row = transitions[i]
+            row_live = live[i]
+            for column in columns:
+                if row_live[column]:
+                    other = row[column]
+                    if numbering[other] == cls.NO_TRANSITION:
+                        numbering[other] = len(order)
+                        order.append(other)
+                        queue.append(other)
+
+        # the rest is done a whole table at a time
+        order = np.array(order, np.intp)
+        sub_live = live[order][:, columns]
+        table = np.where(sub_live, numbering[transitions[order][:, columns]], -1)
+
+        # the alphabet is only the symbols the reachable states use
+        used = sub_live.any(axis=0)
+        alphabet = tuple(store.symbols[c] for c, u in zip(columns, used) if u)
+        table = table[:, used].astype(np.int32)
+        finals = (store.flags[order] & store.FINAL).astype(bool)
+
+        return cls(alphabet, table, finals, order)
+
+    def __len__(self):
+        return len(self.finals)
+
+    def test(self, walk: str) -> bool:
+        if not len(self):
+            return False
+
+        state = 0
+        for char in walk:
+            symbol = self.symbol_index.get(char)
+            if symbol is None:
+                return False
+            state = self.table[state, symbol]
+            if state == self.NO_TRANSITION:
+                return False
+
+        return bool(self.finals[state])
+
+    # The same run as test(), but recording every state on the way. It's kept
+    # apart so test() stays as fast as it can be.
+    def trace(self, walk: str) -> "Trace":
+        # run-length encoded as it goes, a long input that loops in one state
+        # never takes more than a single run
+        values = array("i", [0 if len(self) else self.NO_TRANSITION])
+        lengths = array("i", [1])
+
+        state = values[0]
+        for n, char in enumerate(walk):
+            symbol = self.symbol_index.get(char)
+            if state != self.NO_TRANSITION and symbol is not None:
+                state = self.table[state, symbol]
+            else:
+                state = self.NO_TRANSITION
+
+            if state == values[-1]:
+                lengths[-1] += 1
+            elif state == self.NO_TRANSITION:
+                # stuck for good, the rest of the input is one run
+                values.append(state)
+                lengths.append(len(walk) - n)
+                break
+            else:
+                values.append(state)
+                lengths.append(1)
+
+        accepted = state != self.NO_TRANSITION and bool(self.finals[state])
+        return Trace(walk, np.array(values, np.int32), np.array(lengths), accepted)
+
+    def hash(self) -> str:
+        """Returns a hex digest that is the same for structurally equal machines."""
+        if self._hash is None:
+            h = hashlib.sha256()
+            h.update(len(self.alphabet).to_bytes(4, "little"))
+            for symbol in self.alphabet:
+                encoded = symbol.encode("utf-8")
+                h.update(len(encoded).to_bytes(4, "little"))
+                h.update(encoded)
+            h.update(len(self).to_bytes(4, "little"))
+            h.update(self.table.astype("<i4").tobytes())
+            h.update(self.finals.astype(np.uint8).tobytes())
+            self._hash = h.hexdigest()
+        return self._hash
+
+    def __str__(self):
+        return f"CompiledDFA: {len(self)} states, {len(self.alphabet)} symbols"
+
+
+# The states a CompiledDFA went through on one input, run-length encoded:
+# state values[i] repeated lengths[i] times. Step n is the state after reading
+# n chars, so there are len(walk) + 1 steps. Once the machine has no
+# transition to follow, the rest of the steps are NO_TRANSITION.
+class Trace:
+    def __init__(self, walk: str, values: np.ndarray, lengths: np.ndarray, accepted):
+        self.walk = walk
+        self.values = values
+        self.lengths = lengths
+        self.accepted = accepted
+        self._ends = np.cumsum(lengths)  # the step after the end of each run
+
+    def __len__(self):
+        return int(self._ends[-1])
+
+    def state_at(self, step: int) -> int:
+        return int(self.values[np.searchsorted(self._ends, step, "right")])
+
+    def states(self) -> np.ndarray:
+        """Returns the uncompressed state of every step."""
+        return np.repeat(self.values, self.lengths)
+
+    @property
+    def nbytes(self) -> int:
+        return self.values.nbytes + self.lengths.nbytes
@@ -0,0 +1,62 @@
+import os
+import random
+import string
+import sys
+import timeit
+
+# run from anywhere, without a window
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+import pygame
+
+import pgx
+
+# Times pgx.font.Font.render, which blits glyphs out of an atlas, against
+# rasterizing whole strings through freetype the way it used to, for the
+# strings typing into an input goes through and for short labels.
+#   python benchmarks/glyph_atlas.py
+
+
+def typed(text: str) -> list:
+    return [text[:i] for i in range(1, len(text) + 1)]
+
+
+def main():
+    random.seed(0)
+    sentence = " ".join(
+        "".join(random.choices(string.ascii_letters, k=random.randint(2, 9)))
+        for _ in range(20)
+    )
+    labels = [random.choice("abc01") for _ in range(500)]
+
+    font = pgx.font.roboto
+    black = (0, 0, 0, 255)
+    clear = (0, 0, 0, 0)
+    style = pygame.freetype.STYLE_DEFAULT
+
+    for name, strings in (("typing", typed(sentence)), ("labels", labels)):
+        for size in (16, 30):
+            # the atlas is filled once, it's kept for the life of the font
+            for textstr in strings:
+                font.render(textstr, size, clear, black, style)
+
+            atlas = timeit.timeit(
+                lambda: [font.render(t, size, clear, black, style) for t in strings],
+                number=5,
+            )
+            freetype = timeit.timeit(
+                lambda: [
+                    font._render_freetype(t, size, clear, black, style) for t in strings
+                ],
+                number=5,
+            )
+            per = 5 * len(strings) / 1_000_000
+            print(
+                f"{name} at {size}px: {freetype / per:6.1f}us -> "
+                f"{atlas / per:6.1f}us per string ({freetype / atlas:.1f}x)"
+            )
+
+
+if __name__ == "__main__":
+    main()
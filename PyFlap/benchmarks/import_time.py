@@ -0,0 +1,67 @@
+import os
+import subprocess
+import sys
+
+# Checks that using pgx.File and pgx.Rect on their own stays headless: with
+# the submodules loaded lazily, neither should import pygame or the rest of
+# pgx. Reads `python -X importtime` and exits with 1 if anything it shouldn't
+# have was imported.
+#   python benchmarks/import_time.py
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+HEADLESS = "import pgx; pgx.File; pgx.Rect"
+EVERYTHING = "import pgx; pgx.ui; pgx.Text; pgx.font.roboto"
+
+# what headless use must never pull in
+FORBIDDEN = ("pygame", "pgx.font", "pgx.Text", "pgx.ui", "pgx.image", "pgx.event")
+
+
+# ({module: cumulative microseconds} for everything code imported, total
+# microseconds spent importing)
+def import_times(code: str) -> (dict, int):
+    stderr = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=ROOT,
+        env=dict(os.environ, SDL_VIDEODRIVER="dummy"),
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stderr
+
+    times = {}
+    total = 0
+    for line in stderr.splitlines():
+        # import time: self [us] | cumulative | imported package
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        _, cumulative, name = line[len("import time:") :].split("|")
+        times[name.strip()] = int(cumulative)
+
+        # nested imports are indented under the one that caused them
+        if not name[1:].startswith(" "):
+            total += int(cumulative)
+    return times, total
+
+
+def main():
+    headless, headless_total = import_times(HEADLESS)
+    _, everything_total = import_times(EVERYTHING)
+
+    print(f"{HEADLESS}: {headless_total / 1000:.1f}ms of imports")
+    print(f"{EVERYTHING}: {everything_total / 1000:.1f}ms of imports")
+
+    leaked = sorted(
+        name
+        for name in headless
+        if any(name == f or name.startswith(f + ".") for f in FORBIDDEN)
+    )
+    if leaked:
+        print(f"headless use of pgx imported: {', '.join(leaked)}")
+        sys.exit(1)
+
+    print("headless use of pgx imported nothing it shouldn't")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+import os
+import random
+import string
+import sys
+import time
+
+# run from anywhere, without a window
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+import pygame
+
+import pgx
+
+# Types into a pgx.ui.Input a key at a time, regenerating it the way every key
+# used to, and through its typed line, at a few lengths of text already in it.
+# Checks both come out with the same pixels.
+#   python benchmarks/input_typing.py
+
+KEYS = 200
+
+
+def make_input(text: str, text_width) -> pgx.ui.Input:
+    input_box = pgx.ui.Input(text, (10, 10), groups=["iobox"])
+    input_box.style.text_width = text_width
+    input_box.display()
+    return input_box
+
+
+def keys() -> list:
+    random.seed(0)
+    typed = random.choices(string.ascii_letters + "  ", k=KEYS)
+    # a backspace now and then
+    return [key if random.random() > 0.2 else "\b" for key in typed]
+
+
+def type_keys(input_box, generate) -> float:
+    start = time.perf_counter()
+    for key in keys():
+        if key == "\b":
+            input_box._text = input_box._text[:-1]
+        else:
+            input_box._text += key
+        generate(input_box)
+    return (time.perf_counter() - start) / KEYS
+
+
+def pixels(input_box) -> bytes:
+    area = pygame.Rect((0, 0), input_box.margin_rect.size)
+    return pygame.image.tobytes(input_box._text_surf.subsurface(area), "RGBA")
+
+
+def main():
+    pygame.display.set_mode((800, 600))
+    assets = os.path.join(os.path.dirname(os.path.dirname(__file__)), "assets")
+    pgx.ui.use_stylesheet(os.path.join(assets, "style.json"))
+
+    for text_width in (120, False):
+        for length in (10, 1000, 5000):
+            random.seed(length)
+            text = "".join(random.choices(string.ascii_letters + " ", k=length))
+
+            old_input = make_input(text, text_width)
+            old = type_keys(old_input, pgx.ui.Text._elem_generate)
+
+            new_input = make_input(text, text_width)
+            new = type_keys(new_input, pgx.ui.Input._elem_generate)
+
+            if pixels(old_input) != pixels(new_input):
+                raise AssertionError(f"{length} chars come out differently")
+
+            print(
+                f"text_width {str(text_width):>5}, {length:>5} chars: "
+                f"{old * 1000:7.3f}ms -> {new * 1000:6.3f}ms a key "
+                f"({old / new:.0f}x)"
+            )
+
+
+if __name__ == "__main__":
+    main()
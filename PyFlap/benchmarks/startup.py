@@ -0,0 +1,58 @@
+import os
+import subprocess
+import sys
+
+# Measures how long `import pgx` takes, and how long PyFlap takes to get its
+# first frame on screen, each in a fresh interpreter, best of a few runs.
+#   python benchmarks/startup.py [runs]
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# pygame itself is imported before the clock starts, it isn't pgx's to speed up
+IMPORT_PGX = """
+import time
+import pygame, pygame.freetype
+start = time.perf_counter()
+import pgx
+print(time.perf_counter() - start)
+"""
+
+# runs main.py until it first flips the display
+FIRST_FRAME = """
+import time
+start = time.perf_counter()
+import os, runpy, pygame
+
+def flip():
+    print(time.perf_counter() - start, flush=True)
+    os._exit(0)
+
+pygame.display.flip = flip
+runpy.run_path("main.py", run_name="__main__")
+"""
+
+
+def best_of(code: str, runs: int) -> float:
+    env = dict(os.environ, SDL_VIDEODRIVER="dummy", SDL_AUDIODRIVER="dummy")
+    times = []
+    for _ in range(runs):
+        out = subprocess.run(
+            [sys.executable, "-c", code],
+            cwd=ROOT,
+            env=env,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout
+        times.append(float(out.split()[-1]))
+    return min(times)
+
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    print(f"import pgx:  {best_of(IMPORT_PGX, runs) * 1000:7.1f}ms")
+    print(f"first frame: {best_of(FIRST_FRAME, runs) * 1000:7.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+import os
+import random
+import sys
+import timeit
+
+# run from anywhere, without a window
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+import pgx
+
+# Builds Text objects the way a scrolling list of test results does, mostly
+# the same few strings over and over, with pgx.Text.cache and without it.
+#   python benchmarks/text_cache.py
+
+
+def results(n: int) -> list:
+    random.seed(0)
+    return [random.choice(["True", "False", "", "Result"]) for _ in range(n)]
+
+
+def generate(strings: list) -> None:
+    for textstr in strings:
+        pgx.Text(textstr, 18, font=pgx.font.roboto).get_image()
+
+
+def main():
+    strings = results(5000)
+
+    cache = pgx.Text.cache
+    max_bytes = cache.max_bytes
+
+    # a limit of nothing keeps just the last entry, close to having no cache
+    cache.clear()
+    cache.max_bytes = 0
+    uncached = timeit.timeit(lambda: generate(strings), number=1)
+
+    cache.clear()
+    cache.max_bytes = max_bytes
+    cache.hits = cache.misses = 0
+    cached = timeit.timeit(lambda: generate(strings), number=1)
+
+    print(
+        f"{len(strings)} texts: {uncached * 1000:.1f}ms -> {cached * 1000:.1f}ms, "
+        f"hit rate {cache.hit_rate():.1%}, {len(cache)} entries, "
+        f"{cache.nbytes / 1024:.1f}KiB"
+    )
+
+
+if __name__ == "__main__":
+    main()
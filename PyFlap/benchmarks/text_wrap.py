@@ -0,0 +1,99 @@
+import os
+import random
+import string
+import sys
+import timeit
+
+# run from anywhere, without a window
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+import pygame
+
+import pgx
+
+# Times pgx.Text._split_lines against the way it used to wrap, re-measuring
+# the whole line for every word, and checks they break lines the same way.
+#   python benchmarks/text_wrap.py
+
+
+def remeasuring_split_lines(text):
+    words = text._split_words()
+
+    lines = []
+    current_line = ""
+    while words:
+        if words[0] == "\n":
+            lines.append(current_line)
+            current_line = ""
+            del words[0]
+
+        else:
+            l = text.font.find_px_length(current_line + words[0], text.size, text.style)
+
+            if text.limit is not False and l > text.limit:
+                if current_line == "":
+                    if len(words[0]) == 1:
+                        current_line += words.pop(0)
+                    else:
+                        words[0:1] = list(words[0])
+                else:
+                    lines.append(current_line)
+                    current_line = ""
+
+            else:
+                current_line += words.pop(0)
+
+    if current_line:
+        lines.append(current_line)
+
+    return lines
+
+
+def make_text(length: int, seed: int = 0) -> str:
+    random.seed(seed)
+    words = []
+    while sum(map(len, words)) < length:
+        n = random.choice([1, 2, 3, 4, 5, 6, 8, 12, 40])
+        words.append("".join(random.choices(string.ascii_letters + ".,", k=n)))
+        words.append(random.choice([" ", " ", " ", "  ", "\n"]))
+    return "".join(words)[:length]
+
+
+# size 30 is twice the pixel fonts' image size, so their scaled widths stay
+# whole numbers and adding them up in a different order can't change a break
+SIZE = 30
+
+
+def main():
+    # the pixel fonts convert their images on first use
+    pygame.display.set_mode((1, 1))
+
+    cases = []
+    for font_name in ("opensans", "roboto", "classic"):
+        font = getattr(pgx.font, font_name)
+        for length in (1000, 4000, 8000):
+            for limit in (200, 800, False):
+                text = pgx.Text(make_text(length, length), SIZE, font=font, limit=limit)
+                cases.append((font_name, text))
+
+    # all of the new timings first, measuring very long lines leaves
+    # freetype slower for a while afterwards
+    new = [timeit.timeit(text._split_lines, number=1) for _, text in cases]
+    old = [
+        timeit.timeit(lambda: remeasuring_split_lines(t), number=1) for _, t in cases
+    ]
+
+    for (font_name, text), old_time, new_time in zip(cases, old, new):
+        if remeasuring_split_lines(text) != text._split_lines():
+            raise AssertionError(f"{font_name} breaks {len(text)} chars differently")
+
+        print(
+            f"{font_name:>8} {len(text):>6} chars, limit {str(text.limit):>5}: "
+            f"{old_time * 1000:8.1f}ms -> {new_time * 1000:6.1f}ms "
+            f"({old_time / new_time:.0f}x)"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+import hashlib
+import json
+import os
+import sqlite3
+import time
+
+import numpy as np
+
+from automaton import CompiledDFA
+from workers import test_parallel
+
+# On disk cache of compiled machines and test verdicts, keyed by the canonical
+# machine hash and a hash of the input. Because the machine hash ignores layout,
+# regrading an unchanged machine (or an identical submission) is just lookups.
+# Both tables are capped, and the least recently used rows get evicted first.
+
+
+def hash_input(walk: str) -> str:
+    return hashlib.sha256(walk.encode("utf-8")).hexdigest()
+
+
+class ResultCache:
+    def __init__(self, filepath: str, max_machines: int = 1000, max_verdicts=10 ** 6):
+        directory = os.path.dirname(filepath)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self.filepath = filepath
+        self.max_machines = max_machines
+        self.max_verdicts = max_verdicts
+
+        self.hits = 0
+        self.misses = 0
+
+        self._db = sqlite3.connect(filepath)
+        self._db.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS machines (
+                hash TEXT PRIMARY KEY,
+                alphabet TEXT,
+                states INTEGER,
+                transitions BLOB,
+                finals BLOB,
+                last_used REAL
+            );
+            CREATE TABLE IF NOT EXISTS verdicts (
+                machine TEXT,
+                input TEXT,
+                verdict INTEGER,
+                last_used REAL,
+                PRIMARY KEY (machine, input)
+            );
+            CREATE INDEX IF NOT EXISTS machines_lru ON machines (last_used);
+            CREATE INDEX IF NOT EXISTS verdicts_lru ON verdicts (last_used);
+            """
+        )
+
+    def clone(self) -> "ResultCache":
+        """Opens another connection to the same cache, for use on another thread."""
+        return ResultCache(self.filepath, self.max_machines, self.max_verdicts)
+
+    def put_compiled(self, compiled: CompiledDFA) -> None:
+        with self._db:
+            self._db.execute(
+                "INSERT INTO machines VALUES (?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (hash) DO UPDATE SET last_used = excluded.last_used",
+                (
+                    compiled.hash(),
+                    json.dumps(compiled.alphabet),
+                    len(compiled),
+                    compiled.table.astype("<i4").tobytes(),
+                    compiled.finals.astype(np.uint8).tobytes(),
+                    time.time(),
+                ),
+            )
+            self._evict("machines", self.max_machines)
+
+    def run_tests(self, compiled: CompiledDFA, walks: list, processes=None) -> list:
+        """Tests every walk against the machine, only simulating cache misses.
+
+        If processes is given, the misses are fanned out to that many workers.
+        """
+        self.put_compiled(compiled)
+
+        machine_hash = compiled.hash()
+        input_hashes = [hash_input(walk) for walk in walks]
+        now = time.time()
+
+        known = {}
+        # sqlite caps the number of parameters in a query, so go in chunks
+        for i in range(0, len(input_hashes), 500):
+            chunk = input_hashes[i : i + 500]
+            rows = self._db.execute(
+                "SELECT input, verdict FROM verdicts WHERE machine = ? AND input IN "
+                f"({', '.join('?' * len(chunk))})",
+                (machine_hash, *chunk),
+            )
+            known.update(rows)
+
+        missing = {}
+        for walk, input_hash in zip(walks, input_hashes):
+            if input_hash in known:
+                self.hits += 1
+            else:
+                self.misses += 1
+                missing[input_hash] = walk
+
+        if processes:
+            verdicts = test_parallel(compiled, list(missing.values()), processes)
+        else:
+            verdicts = [compiled.test(walk) for walk in missing.values()]
+
+        new_rows = []
+        for input_hash, verdict in zip(missing, verdicts):
+            known[input_hash] = verdict
+            new_rows.append((machine_hash, input_hash, verdict, now))
+
+        results = [bool(known[input_hash]) for input_hash in input_hashes]
+
+        with self._db:
+            self._db.executemany(
+                "UPDATE verdicts SET last_used = ? WHERE machine = ? AND input = ?",
+                [(now, machine_hash, h) for h in set(input_hashes)],
+            )
+            self._db.executemany(
+                "INSERT OR REPLACE INTO verdicts VALUES (?, ?, ?, ?)", new_rows
+            )
+            self._evict("verdicts", self.max_verdicts)
+
+        return results
+
+    def _evict(self, table: str, limit: int) -> None:
+        (count,) = self._db.execute(f"SELECT COUNT(*) FROM {table}").fetchone()
+        if count > limit:
+            self._db.execute(
+                f"DELETE FROM {table} WHERE rowid IN "
+                f"(SELECT rowid FROM {table} ORDER BY last_used LIMIT ?)",
+                (count - limit,),
+            )
+
+    def clear(self) -> None:
+        with self._db:
+            self._db.execute("DELETE FROM machines")
+            self._db.execute("DELETE FROM verdicts")
+
+    def close(self) -> None:
+        self._db.close()
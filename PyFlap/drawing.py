@@ -0,0 +1,149 @@
+import math
+from typing import Union
+
+import pygame
+
+import pgx
+
+# How nodes and connections look, shared by the editor in main.py and by
+# export.py. Nothing in here needs a window, it all draws onto whatever
+# surface it's given, so machines can be rendered headless.
+
+RADIUS = 25
+
+
+# Reads the background and node colors from the loaded stylesheet, if it fails
+# for some reason, the defaults are provided
+def style_colors() -> tuple:
+    try:
+        bgcolor = pgx.ui.STYLESHEET.general_config.bgcolor
+    except AttributeError:
+        bgcolor = [85, 110, 85]
+
+    try:
+        color = pgx.ui.STYLESHEET.general_config.color
+    except AttributeError:
+        color = "yellow"
+
+    return bgcolor, color
+
+
+# the math behind drawing an arrow from start_pos to end_pos, returns
+# None if they're on top of each other
+def arrow_geometry(
+    start_pos: pygame.Vector2,
+    end_pos: pygame.Vector2,
+    adjust_for_radius: bool,
+    radius: float = RADIUS,
+) -> Union[tuple, None]:
+    direct = start_pos - end_pos
+    if not direct:  # zero length vector, don't draw anything
+        return None
+
+    direction = direct.normalize() * radius
+
+    start = start_pos - direction
+    end = start_pos - direct
+    if adjust_for_radius:
+        end += direction
+
+    direction /= 2
+
+    arrow = [end + direction.rotate(320), end, end + direction.rotate(-320)]
+
+    rot = int(180 - direction.as_polar()[1])
+
+    middle = start.lerp(end, 0.5)
+
+    return start, end, arrow, middle, rot
+
+
+# Works out everything needed to draw the connection from a node at pos to
+# one at other_pos in canvas coordinates, other_pos is None for a self loop.
+# Returns (polylines, self loop arc rect, label anchor, anchor attribute
+# of the label rect, label rotation)
+def connection_geometry(pos: pygame.Vector2, other_pos: pygame.Vector2) -> tuple:
+    radius = RADIUS
+
+    if other_pos is None:
+        rect = pygame.Rect([0, 0, radius * 1.2, radius * 2.8])
+        rect.centerx = pos.x
+        rect.top = pos.y - radius * 2.3
+
+        end = pygame.Vector2(rect.midleft)
+        direction = pygame.Vector2(0, -radius / 2)
+        arrow = [end + direction.rotate(320), end, end + direction.rotate(-320)]
+
+        return [arrow], rect, pygame.Vector2(rect.midtop), "midbottom", 0
+
+    geometry = arrow_geometry(pos, other_pos, True)
+    if geometry is None:
+        return [], None, pos, "bottomright", 0
+
+    start, end, arrow, middle, rot = geometry
+
+    # adjust backwards facing connections to be more "up" facing
+    if 90 < rot < 270:
+        rot = 180 + rot
+
+    return [[start, end], arrow], None, middle, "bottomright", rot
+
+
+# Draws connection geometry scaled by zoom, with its label from a LabelCache.
+# Without a label (char is None) the lines are drawn without antialiasing,
+# for zoomed out views.
+def draw_connection(
+    screen, offset, zoom, char, geometry, labels, color="black"
+) -> None:
+    lines, arc_rect, anchor, anchor_attr, rot = geometry
+    draw_lines = pygame.draw.aalines if char is not None else pygame.draw.lines
+
+    for points in lines:
+        draw_lines(screen, color, False, [p * zoom + offset for p in points])
+
+    if arc_rect:
+        rect = pygame.Rect(
+            pygame.Vector2(arc_rect.topleft) * zoom + offset,
+            pygame.Vector2(arc_rect.size) * zoom,
+        )
+        pygame.draw.arc(screen, color, rect, 0.01, math.pi)
+
+    if char is not None:
+        surf, rect = labels.render(char, rot, round(16 * zoom), color)
+        setattr(rect, anchor_attr, anchor * zoom + offset)
+        screen.blit(surf, rect)
+
+
+# the blue triangle pointing into an initial state at position
+def initial_arrow(position: pygame.Vector2, zoom: float = 1) -> list:
+    point1 = pygame.Vector2(position)
+    point1.x -= RADIUS * zoom
+    point2 = pygame.Vector2(point1)
+    point2.x -= 15 * zoom
+    point2.y += 15 * zoom
+    point3 = pygame.Vector2(point1)
+    point3.x -= 15 * zoom
+    point3.y -= 15 * zoom
+    return [point1, point2, point3]
+
+
+def draw_node(
+    screen: pygame.Surface,
+    position: pygame.Vector2,
+    color,
+    initial: bool,
+    final: bool,
+    zoom: float = 1,
+    detailed: bool = True,
+) -> None:
+    radius = RADIUS * zoom
+    width = max(1, round(2 * zoom))
+
+    if initial:
+        pygame.draw.polygon(screen, "blue", initial_arrow(position, zoom))
+
+    pygame.draw.circle(screen, color, position, radius)
+    pygame.draw.circle(screen, "black", position, radius, width)
+
+    if final and detailed:
+        pygame.draw.circle(screen, "black", position, radius * 0.8, width)
@@ -0,0 +1,225 @@
+import argparse
+import math
+import multiprocessing
+import os
+from xml.sax.saxutils import escape
+
+# nothing here opens a window, machines are drawn onto offscreen surfaces
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+import pygame
+import pygame.freetype
+
+import pgx
+
+from drawing import (
+    RADIUS,
+    style_colors,
+    connection_geometry,
+    draw_connection,
+    draw_node,
+    initial_arrow,
+)
+from render_cache import LabelCache
+from store import MachineStore
+
+# Renders saved machines (see MachineStore.save) to PNG or SVG figures without
+# a window, with the same geometry the editor draws. A whole directory can be
+# exported at once, spread across processes:
+#   python export.py machines/ figures/ --format svg --processes 4
+
+pygame.freetype.init()
+
+ASSETS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "assets")
+pgx.ui.use_stylesheet(os.path.join(ASSETS, "style.json"))
+BG_COLOR, NODE_COLOR = style_colors()
+
+FONT = pygame.freetype.Font(pgx.font.roboto.path)
+LABELS = LabelCache(FONT)
+
+# room around the outermost nodes for self loops, labels and initial arrows
+MARGIN = RADIUS * 3
+
+
+# the canvas area a figure covers, as (size, offset to add to positions)
+def _frame(store: MachineStore, scale: float) -> (tuple, pygame.Vector2):
+    positions = store.positions[store.ids()]
+    if not len(positions):
+        size = math.ceil(MARGIN * 2 * scale)
+        return (size, size), pygame.Vector2(MARGIN * scale)
+
+    low = positions.min(axis=0) - MARGIN
+    high = positions.max(axis=0) + MARGIN
+    size = tuple(math.ceil(n) for n in (high - low) * scale)
+    return size, pygame.Vector2(*-low * scale)
+
+
+def _connections(store: MachineStore):
+    positions = store.positions
+    for (source, target), label in store.edge_labels().items():
+        other_pos = None if source == target else pygame.Vector2(*positions[target])
+        geometry = connection_geometry(pygame.Vector2(*positions[source]), other_pos)
+        yield label, geometry
+
+
+def _nodes(store: MachineStore):
+    for i in store.ids().tolist():
+        pos = pygame.Vector2(*store.positions[i])
+        initial = store.get_flag(i, store.INITIAL)
+        final = store.get_flag(i, store.FINAL)
+        yield pos, initial, final
+
+
+def render(store: MachineStore, scale: float = 1) -> pygame.Surface:
+    """Draws the whole machine onto a new surface, sized to fit it."""
+    size, offset = _frame(store, scale)
+    surface = pygame.Surface(size)
+    surface.fill(BG_COLOR)
+
+    for label, geometry in _connections(store):
+        draw_connection(surface, offset, scale, label, geometry, LABELS)
+
+    for pos, initial, final in _nodes(store):
+        draw_node(surface, pos * scale + offset, NODE_COLOR, initial, final, scale)
+
+    return surface
+
+
+def export_png(store: MachineStore, filepath: str, scale: float = 1) -> None:
+    pygame.image.save(render(store, scale), filepath)
+
+
+def _svg_color(color) -> str:
+    if not isinstance(color, str):
+        color = tuple(color)
+    color = pygame.Color(color)
+    return f"rgb({color.r},{color.g},{color.b})"
+
+
+def _svg_points(points) -> str:
+    return " ".join(f"{p.x:.2f},{p.y:.2f}" for p in points)
+
+
+def to_svg(store: MachineStore, scale: float = 1) -> str:
+    """The machine as an SVG document, drawn the same way as render()."""
+    (width, height), offset = _frame(store, scale)
+    stroke = max(1, round(2 * scale))
+    font_size = round(16 * scale)
+
+    svg = [
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" '
+        f'height="{height}" viewBox="0 0 {width} {height}">',
+        f'<rect width="100%" height="100%" fill="{_svg_color(BG_COLOR)}"/>',
+        '<g fill="none" stroke="black">',
+    ]
+
+    labels = []
+    for label, geometry in _connections(store):
+        lines, arc_rect, anchor, anchor_attr, rot = geometry
+
+        for points in lines:
+            points = [p * scale + offset for p in points]
+            svg.append(f'<polyline points="{_svg_points(points)}"/>')
+
+        if arc_rect:
+            # the top half of the ellipse in arc_rect, as pygame.draw.arc does
+            center = pygame.Vector2(arc_rect.center) * scale + offset
+            rx = arc_rect.width / 2 * scale
+            ry = arc_rect.height / 2 * scale
+            svg.append(
+                f'<path d="M {center.x + rx:.2f},{center.y:.2f} '
+                f'A {rx:.2f} {ry:.2f} 0 0 0 {center.x - rx:.2f},{center.y:.2f}"/>'
+            )
+
+        # placed like the rendered label, by the center of its rotated rect
+        rect = FONT.get_rect(label, rotation=rot, size=font_size)
+        setattr(rect, anchor_attr, anchor * scale + offset)
+        x, y = rect.center
+        labels.append(
+            f'<text x="{x}" y="{y}" transform="rotate({-rot} {x} {y})">'
+            f"{escape(label)}</text>"
+        )
+
+    svg.append("</g>")
+    svg.append(
+        f'<g font-family="Roboto, sans-serif" font-size="{font_size}" '
+        'text-anchor="middle" dominant-baseline="central">'
+    )
+    svg.extend(labels)
+    svg.append("</g>")
+
+    radius = RADIUS * scale
+    svg.append(f'<g stroke="black" stroke-width="{stroke}">')
+    for pos, initial, final in _nodes(store):
+        pos = pos * scale + offset
+        if initial:
+            points = _svg_points(initial_arrow(pos, scale))
+            svg.append(f'<polygon points="{points}" fill="blue" stroke="none"/>')
+
+        # pygame draws outlines inside the radius, svg centers them on it
+        svg.append(
+            f'<circle cx="{pos.x:.2f}" cy="{pos.y:.2f}" r="{radius - stroke / 2:.2f}" '
+            f'fill="{_svg_color(NODE_COLOR)}"/>'
+        )
+        if final:
+            svg.append(
+                f'<circle cx="{pos.x:.2f}" cy="{pos.y:.2f}" '
+                f'r="{radius * 0.8 - stroke / 2:.2f}" fill="none"/>'
+            )
+    svg.append("</g>")
+
+    svg.append("</svg>")
+    return "\n".join(svg)
+
+
+def export_svg(store: MachineStore, filepath: str, scale: float = 1) -> None:
+    with open(filepath, "w") as f:
+        f.write(to_svg(store, scale))
+
+
+EXPORTERS = {"png": export_png, "svg": export_svg}
+
+
+def _export_file(job) -> str:
+    source, target, fmt, scale = job
+    EXPORTERS[fmt](MachineStore.load(source), target, scale)
+    return target
+
+
+def export_directory(
+    source_dir: str, target_dir: str, fmt: str = "png", scale=1, processes=None
+) -> list:
+    """Exports every .json machine in source_dir, returns the files written."""
+    os.makedirs(target_dir, exist_ok=True)
+
+    jobs = []
+    for name in sorted(os.listdir(source_dir)):
+        base, extension = os.path.splitext(name)
+        if extension == ".json":
+            target = os.path.join(target_dir, f"{base}.{fmt}")
+            jobs.append((os.path.join(source_dir, name), target, fmt, scale))
+
+    if not jobs:
+        return []
+
+    with multiprocessing.Pool(processes) as pool:
+        return pool.map(_export_file, jobs)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export saved PyFlap machines.")
+    parser.add_argument("source", help="directory of machine .json files")
+    parser.add_argument("target", help="directory to write the figures to")
+    parser.add_argument("--format", choices=sorted(EXPORTERS), default="png")
+    parser.add_argument("--scale", type=float, default=1)
+    parser.add_argument("--processes", type=int, default=None)
+    args = parser.parse_args()
+
+    written = export_directory(
+        args.source, args.target, args.format, args.scale, args.processes
+    )
+    print(f"exported {len(written)} machines to {args.target}")
+
+
+if __name__ == "__main__":
+    main()
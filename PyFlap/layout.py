@@ -0,0 +1,119 @@
+import numpy as np
+
+# Fruchterman-Reingold force directed layout, computed over the whole
+# position array at once. Nodes push each other apart and connections pull
+# them together, with a temperature capping how far anything moves per
+# iteration, that cools off until the layout settles.
+#
+# Repulsion only acts between nodes within 2 * k of each other (the grid
+# variant from the original paper). Nodes are bucketed into cells of that
+# size, so each one only has to be compared to the nodes in the 3x3 cells
+# around it, instead of to every other node.
+
+
+class ForceLayout:
+    def __init__(self, store, k: float = 150, iterations: int = 200):
+        self.store = store
+        self.k = k  # ideal distance between connected nodes
+
+        self.temperature = k * 2
+        self.cooling = (k / 50 / self.temperature) ** (1 / iterations)
+
+        # pulls separate groups of nodes in, so they don't drift off forever
+        self.gravity = 0.05
+
+        self._rng = np.random.default_rng(0)
+
+    @property
+    def done(self) -> bool:
+        return self.temperature < self.k / 50
+
+    def step(self, iterations: int = 1) -> None:
+        """Runs some iterations, moving nodes in the store directly."""
+        store = self.store
+        ids = store.ids()
+        if len(ids) < 2:
+            self.temperature = 0
+            return
+
+        pos = store.positions[ids].astype(np.float64)
+        edges = self._edges(ids)
+
+        for _ in range(iterations):
+            if self.done:
+                break
+
+            disp = self._repulsion(pos) + self._attraction(pos, edges)
+            disp += (pos.mean(axis=0) - pos) * self.gravity
+
+            length = np.linalg.norm(disp, axis=1, keepdims=True)
+            pos += (
+                disp / np.maximum(length, 1e-9) * np.minimum(length, self.temperature)
+            )
+
+            self.temperature *= self.cooling
+
+        store.positions[ids] = pos
+
+    # connections as (source index, target index) pairs into ids
+    def _edges(self, ids: np.ndarray) -> (np.ndarray, np.ndarray):
+        store = self.store
+        index = np.full(store.count, -1, np.intp)
+        index[ids] = np.arange(len(ids))
+
+        transitions = store.transitions[ids, : len(store.symbols)]
+        sources, columns = np.nonzero(transitions != store.NO_TRANSITION)
+        targets = index[transitions[sources, columns]]
+
+        not_loop = sources != targets
+        return sources[not_loop], targets[not_loop]
+
+    def _attraction(self, pos: np.ndarray, edges) -> np.ndarray:
+        sources, targets = edges
+        delta = pos[sources] - pos[targets]
+        dist = np.linalg.norm(delta, axis=1, keepdims=True)
+        force = delta * dist / self.k  # direction * dist ** 2 / k
+
+        disp = np.zeros_like(pos)
+        for axis in range(2):
+            disp[:, axis] -= np.bincount(sources, force[:, axis], len(pos))
+            disp[:, axis] += np.bincount(targets, force[:, axis], len(pos))
+        return disp
+
+    def _repulsion(self, pos: np.ndarray) -> np.ndarray:
+        n = len(pos)
+        cell_size = self.k * 2
+
+        cells = np.floor(pos / cell_size).astype(np.int64)
+        keys = cells[:, 0] * 2 ** 32 + cells[:, 1]
+        order = np.argsort(keys)
+        sorted_keys = keys[order]
+
+        disp = np.zeros_like(pos)
+        for dx in (-1, 0, 1):
+            for dy in (-1, 0, 1):
+                # for each node, the run of sorted nodes in the neighboring cell
+                neighbor_keys = (cells[:, 0] + dx) * 2 ** 32 + cells[:, 1] + dy
+                lo = np.searchsorted(sorted_keys, neighbor_keys, "left")
+                counts = np.searchsorted(sorted_keys, neighbor_keys, "right") - lo
+                total = counts.sum()
+                if not total:
+                    continue
+
+                i = np.repeat(np.arange(n), counts)
+                run_start = np.repeat(np.cumsum(counts) - counts, counts)
+                j = order[np.repeat(lo, counts) + np.arange(total) - run_start]
+
+                delta = pos[i] - pos[j]
+                dist2 = (delta ** 2).sum(axis=1)
+
+                # nodes right on top of each other get pushed apart randomly
+                stacked = (dist2 == 0) & (i != j)
+                delta[stacked] = self._rng.uniform(-1, 1, (stacked.sum(), 2))
+                dist2[stacked] = (delta[stacked] ** 2).sum(axis=1)
+
+                close = (i != j) & (dist2 < cell_size ** 2)
+                force = delta[close] * (self.k ** 2 / dist2[close])[:, None]
+                for axis in range(2):
+                    disp[:, axis] += np.bincount(i[close], force[:, axis], n)
+        return disp
@@ -1,7 +1,7 @@
 import math
-from collections import defaultdict
 from typing import Union
 
+import numpy as np
 import pygame
 import pygame.freetype
 
@@ -12,27 +12,35 @@ import pgx
 
 # some more custom UI elements specific to this project were moved
 # into their own file
-from widgets import NodeMenu, TestMenu, InfoOutput
+from widgets import NodeMenu, TestMenu, InfoOutput, Minimap, SimulationMenu
+
+# the machine logic flattened into numpy tables, for hashing and fast testing
+from automaton import CompiledDFA, Trace
+from store import MachineStore, Connections
+from spatial import SpatialGrid
+from render_cache import LabelCache, CachedLayer
+from layout import ForceLayout
+from cache import ResultCache
+from drawing import (
+    RADIUS,
+    style_colors,
+    arrow_geometry,
+    connection_geometry,
+    draw_connection,
+    draw_node,
+)
 
 pygame.init()
 pygame.freetype.init()
 
 FONT = pygame.freetype.Font(pgx.font.roboto.path)
+LABELS = LabelCache(FONT)
 
 pgx.path.set_projectpath("assets")
 pgx.ui.use_stylesheet("style.json")
 
 # Set the node color and screen background color from the config stylesheet
-# if it fails for some reason, the defaults are provided
-try:
-    BG_COLOR = pgx.ui.STYLESHEET.general_config.bgcolor
-except AttributeError:
-    BG_COLOR = [85, 110, 85]
-
-try:
-    NODE_COLOR = pgx.ui.STYLESHEET.general_config.color
-except AttributeError:
-    NODE_COLOR = "yellow"
+BG_COLOR, NODE_COLOR = style_colors()
 
 screen = pygame.display.set_mode((1280, 720))
 pygame.display.set_caption("PyFlap")
@@ -48,8 +56,24 @@ class NFAError(NotImplementedError):
 # The DFA class provides the logical and graphical functionality for the
 # building and testing the machine.
 class DFA:
-    def __init__(self):
-        self.nodes = []
+    MIN_ZOOM = 0.02
+    MAX_ZOOM = 4
+
+    # below these zoom levels, detail is dropped: first labels and
+    # antialiasing, then everything but a dot for each node
+    LABEL_ZOOM = 0.5
+    DOT_ZOOM = 0.2
+
+    def __init__(self, cache: ResultCache = None):
+        # all of the state data lives in the store, Nodes are views into it
+        self.store = MachineStore()
+        self.nodes = {}  # id: Node
+
+        # buckets node ids by position for hit-testing
+        self.grid = SpatialGrid(Node.radius * 2)
+
+        # optional on disk cache of test verdicts
+        self.cache = cache
 
         self.initial_node = None
 
@@ -57,21 +81,58 @@ class DFA:
         self.pending_connection_input = pgx.ui.Input("", (50, 50), groups=["iobox"])
 
         self.offset = pygame.Vector2()
+        self.zoom = 1
 
         self.node_menu = False
 
+        # bumped on every change to the machine's logic (not its layout), so
+        # anything derived from the structure can be cached per version
+        self.version = 0
+        self._compiled = None
+        self._compiled_version = -1
+        self._labels = {}
+        self._labels_version = -1
+        self._geometry = {}  # (source, target): (source pos, target pos, geometry)
+
+        # bumped whenever a node moves, the machine's layer is redrawn when
+        # either version changes
+        self.geometry_version = 0
+        self.layer = CachedLayer(self._draw_static, BG_COLOR)
+
+        # the automatic layout in progress, if there is one
+        self.layout = None
+
+        # what a step through simulation is pointing at, drawn over the layer:
+        # (node id, (source id, target id) of the edge just taken, or None)
+        self.highlight = None
+
     def move(self, x: float, y: float) -> None:
         self.offset.x += x
         self.offset.y += y
 
+    def to_screen(self, pos) -> pygame.Vector2:
+        return pygame.Vector2(pos) * self.zoom + self.offset
+
+    def to_world(self, pos) -> pygame.Vector2:
+        return (pygame.Vector2(pos) - self.offset) / self.zoom
+
+    # zooms by factor, keeping whatever is under screen_pos in place
+    def zoom_at(self, screen_pos, factor: float) -> None:
+        world = self.to_world(screen_pos)
+        self.zoom = min(max(self.zoom * factor, self.MIN_ZOOM), self.MAX_ZOOM)
+        self.offset.update(pygame.Vector2(screen_pos) - world * self.zoom)
+
     def draw(self, screen: pygame.Surface) -> None:
-        for node in self.nodes:
-            node.draw(screen, self.offset)
+        key = (self.version, self.geometry_version, self.zoom)
+        self.layer.draw(screen, self.offset, key)
+
+        if self.highlight:
+            self._draw_highlight(screen)
 
         if self.pending_connection:
             node1, node2 = self.pending_connection
             middle, _ = self.draw_connection_to_pos(
-                screen, node1, node2.pos + self.offset, True
+                screen, node1, self.to_screen(node2.pos), True
             )
             self.pending_connection_input.location = middle
             self.pending_connection_input.display()
@@ -81,7 +142,7 @@ class DFA:
                     text = "λ"
                 node1, node2 = self.pending_connection
                 try:
-                    node1.add_connection(text, node2)
+                    self.add_connection(node1, text, node2)
                     self.pending_connection = False
                 except NFAError:
                     self.pending_connection_input.selected = True
@@ -92,30 +153,185 @@ class DFA:
             if not self.node_menu.active:
                 self.node_menu = None
 
+    # draws the nodes and connections that land in area, for the CachedLayer
+    def _draw_static(self, surface, offset: pygame.Vector2, area: pygame.Rect):
+        zoom = self.zoom
+        if zoom < self.DOT_ZOOM:
+            self._draw_dots(surface, offset, area)
+            return
+
+        visible, connections = self._cull(area, offset)
+        labels = self._get_labels()
+        detailed = zoom >= self.LABEL_ZOOM
+
+        for source, target in connections:
+            geometry = self._get_geometry(source, target)
+            label = labels[source, target] if detailed else None
+            draw_connection(surface, offset, zoom, label, geometry, LABELS)
+
+        for i in visible:
+            self.nodes[i].draw(surface, offset, zoom, detailed)
+
+    # the simulation's current node and the edge that led to it, in red
+    def _draw_highlight(self, screen: pygame.Surface) -> None:
+        node, edge = self.highlight
+        zoom = self.zoom
+        # the same whole pixel offset the layer was drawn at
+        offset = pygame.Vector2(round(self.offset.x), round(self.offset.y))
+
+        if edge and zoom >= self.DOT_ZOOM:
+            label = self._get_labels()[edge] if zoom >= self.LABEL_ZOOM else None
+            geometry = self._get_geometry(*edge)
+            draw_connection(screen, offset, zoom, label, geometry, LABELS, "red")
+
+        position = pygame.Vector2(*self.store.positions[node]) * zoom + offset
+        radius = max(3, (Node.radius + 4) * zoom)
+        pygame.draw.circle(screen, "red", position, radius, max(2, round(3 * zoom)))
+
+    # Zoomed all the way out, every node is a 2x2 dot written straight into
+    # the surface's pixels in one go. Pixel writes ignore the clip, so only
+    # the ones inside area are touched.
+    def _draw_dots(self, surface, offset: pygame.Vector2, area: pygame.Rect):
+        store = self.store
+        ids = store.ids()
+        positions = store.positions[ids] * self.zoom + np.array(offset, np.float32)
+        x = np.floor(positions[:, 0]).astype(np.intp)
+        y = np.floor(positions[:, 1]).astype(np.intp)
+
+        color = surface.map_rgb(pygame.Color(NODE_COLOR))
+        pixels = pygame.surfarray.pixels2d(surface)
+        for dx, dy in ((0, 0), (1, 0), (0, 1), (1, 1)):
+            px = x + dx
+            py = y + dy
+            inside = (
+                (px >= area.left)
+                & (px < area.right)
+                & (py >= area.top)
+                & (py < area.bottom)
+            )
+            pixels[px[inside], py[inside]] = color
+        del pixels  # unlocks the surface
+
+    # Works out what's in view a whole array at a time. Returns the ids of
+    # visible nodes, and the (source id, target id) of every connection that
+    # could be seen.
+    def _cull(self, view: pygame.Rect, offset: pygame.Vector2) -> (np.ndarray, dict):
+        store = self.store
+        offset = np.array(offset, np.float32)
+
+        # generous, so self loops, labels and initial arrows don't pop in
+        margin = math.ceil(Node.radius * 4 * self.zoom)
+        area = view.inflate(margin * 2, margin * 2)
+
+        positions = store.positions[: store.count] * self.zoom + offset
+        x = positions[:, 0]
+        y = positions[:, 1]
+        on_screen = (
+            (store.flags[: store.count] & store.EXISTS).astype(bool)
+            & (x >= area.left)
+            & (x < area.right)
+            & (y >= area.top)
+            & (y < area.bottom)
+        )
+
+        transitions = store.transitions[: store.count, : len(store.symbols)]
+        sources, columns = np.nonzero(transitions != store.NO_TRANSITION)
+        targets = transitions[sources, columns]
+        keep = on_screen[sources] | on_screen[targets]
+
+        # connections between two offscreen nodes can still cross the screen.
+        # Same answer as clipping each line against area, but for all at once:
+        # a line misses if its bounding box does, or if every corner of area
+        # is on the same side of it.
+        x1, x2 = x[sources], x[targets]
+        y1, y2 = y[sources], y[targets]
+        crossing = (
+            ~keep
+            & (np.minimum(x1, x2) < area.right)
+            & (np.maximum(x1, x2) >= area.left)
+            & (np.minimum(y1, y2) < area.bottom)
+            & (np.maximum(y1, y2) >= area.top)
+        )
+        x1, x2, y1, y2 = x1[crossing], x2[crossing], y1[crossing], y2[crossing]
+        corners = (area.topleft, area.topright, area.bottomleft, area.bottomright)
+        sides = np.array(
+            [(x2 - x1) * (cy - y1) - (y2 - y1) * (cx - x1) for cx, cy in corners]
+        )
+        keep[crossing] = ~((sides > 0).all(axis=0) | (sides < 0).all(axis=0))
+
+        connections = dict.fromkeys(zip(sources[keep].tolist(), targets[keep].tolist()))
+        return np.flatnonzero(on_screen), connections
+
+    # The label text of every connection, with the chars between the same two
+    # nodes grouped together. Only rebuilt when the machine changes.
+    def _get_labels(self) -> dict:
+        if self._labels_version != self.version:
+            self._labels = self.store.edge_labels()
+            self._labels_version = self.version
+
+            # forget the geometry of connections that are gone
+            self._geometry = {
+                key: value
+                for key, value in self._geometry.items()
+                if key in self._labels
+            }
+        return self._labels
+
+    # Connection geometry is cached along with the node positions it was
+    # worked out for, and only recalculated once one of them has moved.
+    def _get_geometry(self, source: int, target: int) -> tuple:
+        positions = self.store.positions
+        source_pos = tuple(positions[source])
+        target_pos = tuple(positions[target])
+
+        entry = self._geometry.get((source, target))
+        if entry is None or entry[0] != source_pos or entry[1] != target_pos:
+            other_pos = None if source == target else pygame.Vector2(*target_pos)
+            geometry = connection_geometry(pygame.Vector2(*source_pos), other_pos)
+            entry = (source_pos, target_pos, geometry)
+            self._geometry[source, target] = entry
+
+        return entry[2]
+
     def add_node_at(self, pos: pygame.Vector2) -> None:
-        pos -= self.offset
+        pos = self.to_world(pos)
 
-        self.nodes.append(Node(pos))
+        node = Node(self.store, self.store.add_state(pos))
+        self.nodes[node.id] = node
+        self.grid.insert(node.id, node.pos)
+        self.geometry_version += 1
+        self.version += 1
 
         if len(self.nodes) == 1:  # if this is the first node
-            self.nodes[0].initial = True
-            self.initial_node = self.nodes[0]
+            node.initial = True
+            self.initial_node = node
             # could be pretty error prone to store the initial_ness two separate places
 
     def get_node_at(self, pos: pygame.Vector2) -> "Node":
-        pos -= self.offset
-
-        for node in self.nodes:
-            if (pos - node.pos).length_squared() < node.radius ** 2:
-                return node
-        return False
+        pos = self.to_world(pos)
+
+        # the closest of the nodes in the grid cells around pos
+        closest = False
+        closest_dist = Node.radius ** 2
+        for i in self.grid.query_point(pos, Node.radius):
+            dist = (pos - self.store.positions[i]).length_squared()
+            if dist < closest_dist:
+                closest = self.nodes[i]
+                closest_dist = dist
+        return closest
 
     def move_node_to(self, node: "Node", pos: pygame.Vector2) -> None:
-        pos -= self.offset
+        pos = self.to_world(pos)
+        old_pos = node.pos
         node.pos = pos
+        self.grid.move(node.id, old_pos, node.pos)
+        self.geometry_version += 1
 
     def move_node_by(self, node: "Node", off: pygame.Vector2) -> None:
-        node.pos += off
+        old_pos = node.pos
+        node.pos += pygame.Vector2(off) / self.zoom
+        self.grid.move(node.id, old_pos, node.pos)
+        self.geometry_version += 1
 
     def make_node_initial(self, node: "Node") -> None:
         if self.initial_node:
@@ -123,11 +339,23 @@ class DFA:
 
         self.initial_node = node
         self.initial_node.initial = True
+        self.version += 1
 
     def make_node_uninitial(self, node: "Node") -> None:
         node.initial = False
         if node == self.initial_node:
             self.initial_node = None
+        self.version += 1
+
+    def set_node_final(self, node: "Node", final: bool) -> None:
+        node.final = final
+        self.version += 1
+
+    def add_connection(self, node1: "Node", char: str, node2: "Node") -> None:
+        if not (node1.exists and node2.exists):
+            return
+        node1.add_connection(char, node2)
+        self.version += 1
 
     def draw_connection_to_pos(
         self,
@@ -136,9 +364,11 @@ class DFA:
         pos: pygame.Vector2,
         adjust_radius: bool = False,
     ):
-        position = node.pos + self.offset
-        pos -= self.offset
-        return node.draw_connection_to_pos(screen, position, pos, adjust_radius)
+        position = self.to_screen(node.pos)
+        pos = self.to_world(pos)
+        return node.draw_connection_to_pos(
+            screen, position, pos, adjust_radius, self.zoom
+        )
 
     def connect_query(self, node1: "Node", node2: "Node") -> None:
         self.pending_connection_input.selected = True
@@ -146,15 +376,93 @@ class DFA:
         self.pending_connection = (node1, node2)
 
     def delete_node(self, node: "Node") -> None:
-        node.exists = False
-        self.nodes.remove(node)
+        # takes every transition into and out of node with it
+        self.grid.remove(node.id, node.pos)
+        self.store.remove_state(node.id)
+        self.geometry_version += 1
+        del self.nodes[node.id]
 
+        # the id gets reused, so nothing can keep looking at it
         if self.initial_node == node:
             self.initial_node = None
+        if self.pending_connection and node in self.pending_connection:
+            self.pending_connection = False
+        if self.node_menu and self.node_menu.node == node:
+            self.node_menu = None
+        if self.highlight:
+            current, edge = self.highlight
+            if current == node.id or (edge and node.id in edge):
+                self.highlight = None
+        self.version += 1
+
+    def start_layout(self) -> None:
+        self.layout = ForceLayout(self.store)
+
+    def stop_layout(self) -> None:
+        self.layout = None
+
+    # runs a few layout iterations each frame, so the nodes can be seen
+    # moving into place
+    def step_layout(self, iterations: int = 2) -> None:
+        if not self.layout:
+            return
+
+        self.layout.step(iterations)
+
+        ids = self.store.ids()
+        self.grid.rebuild(ids, self.store.positions[ids])
+        self.geometry_version += 1
+
+        if self.layout.done:
+            self.layout = None
 
     def open_node_menu(self, node: "Node") -> None:
         self.node_menu = NodeMenu(node, self)
 
+    def compile(self) -> CompiledDFA:
+        """Returns the machine as a table, recompiling only if it has changed."""
+        if self._compiled_version != self.version:
+            initial = self.initial_node.id if self.initial_node else None
+            self._compiled = CompiledDFA.from_store(self.store, initial)
+            self._compiled_version = self.version
+        return self._compiled
+
+    def canonical_hash(self) -> str:
+        """Content hash of the machine, independent of node order and position."""
+        return self.compile().hash()
+
+    def check_initial(self) -> bool:
+        """Returns whether there's an initial state, complaining if there isn't."""
+        if not self.initial_node:
+            print("Languages without initial states are very intolerant...")
+            return False
+        return True
+
+    def test_all(
+        self, walks: list, compiled: CompiledDFA = None, cache: ResultCache = None
+    ) -> list:
+        """Tests many inputs at once, going through the result cache if present.
+
+        Off the main thread, pass the machine compiled on it, and a connection
+        to the cache of the thread's own (see ResultCache.clone).
+        """
+        if compiled is None:
+            if not self.check_initial():
+                return [False] * len(walks)
+            compiled = self.compile()
+
+        if cache is None:
+            cache = self.cache
+        if cache is None:
+            return [compiled.test(walk) for walk in walks]
+        return cache.run_tests(compiled, walks)
+
+    def trace(self, walk: str) -> Union[Trace, None]:
+        """Records the run over walk, for stepping through."""
+        if not self.check_initial():
+            return None
+        return self.compile().trace(walk)
+
     def test(self, walk: str) -> bool:
         n = self.initial_node
 
@@ -174,16 +482,53 @@ class DFA:
 
 # The Node class provides logical functionality (a state, transitions),
 # but most of the complexity is with it's graphical functionality, especially
-# drawing the transitions, which was challenging to do right
+# drawing the transitions, which was challenging to do right. That drawing
+# lives in drawing.py, so machines can also be exported without a window.
+# A Node is just a view of one state id in the machine's MachineStore, so
+# two Nodes are equal if they look at the same state.
 class Node:
-    radius = 25
+    __slots__ = ("store", "id")
+
+    radius = RADIUS
+
+    def __init__(self, store: MachineStore, id: int):
+        self.store = store
+        self.id = id
+
+    def __eq__(self, other):
+        return (
+            isinstance(other, Node)
+            and self.id == other.id
+            and self.store is other.store
+        )
+
+    def __hash__(self):
+        return hash(self.id)
+
+    def _get_pos(self) -> pygame.Vector2:
+        return pygame.Vector2(*self.store.positions[self.id])
 
-    def __init__(self, pos):
-        self.pos = pygame.Vector2(pos)
-        self.connections = {}
-        self.initial = False
-        self.final = False
-        self.exists = True
+    def _set_pos(self, pos) -> None:
+        self.store.positions[self.id] = pos
+
+    pos = property(_get_pos, _set_pos)
+
+    def _make_flag(flag):
+        return property(
+            lambda x: x.store.get_flag(x.id, flag),
+            lambda x, value: x.store.set_flag(x.id, flag, value),
+        )
+
+    initial = _make_flag(MachineStore.INITIAL)
+    final = _make_flag(MachineStore.FINAL)
+
+    @property
+    def exists(self) -> bool:
+        return self.store.exists(self.id)
+
+    @property
+    def connections(self) -> Connections:
+        return Connections(self)
 
     def add_connection(self, char, node) -> None:
         if char in self.connections:
@@ -205,124 +550,37 @@ class Node:
         position: pygame.Vector2,
         other_pos: pygame.Vector2,
         adjust_for_radius: bool = True,
+        zoom: float = 1,
     ) -> (pygame.Vector2, int):
-        radius = Node.radius
-
-        direct = self.pos - other_pos
-        if not direct:  # zero length vector, don't draw anything
+        geometry = arrow_geometry(
+            position,
+            position - (self.pos - other_pos) * zoom,
+            adjust_for_radius,
+            Node.radius * zoom,
+        )
+        if geometry is None:
             return position, 0  # default return args?
 
-        direction = direct.normalize() * radius
-
-        start = position - direction
-        end = position - direct  # + direction #other.pos + direction
-        if adjust_for_radius:
-            end += direction
-
-        direction /= 2
-
-        arrow_direction = direction.rotate(320)
-        pygame.draw.aaline(screen, "black", end, end + arrow_direction)
-
-        arrow_direction = direction.rotate(-320)
-        pygame.draw.aaline(screen, "black", end, end + arrow_direction)
-
+        start, end, arrow, middle, rot = geometry
+        pygame.draw.aalines(screen, "black", False, arrow)
         pygame.draw.aaline(screen, "black", start, end)
 
-        rot = int(180 - direction.as_polar()[1])
-
-        middle = start.lerp(end, 0.5)
-
         return middle, rot
 
-    def _draw_connection(self, screen, position, char, other):
-        radius = Node.radius
-
-        if other == self:
-            rect = pygame.Rect([0, 0, radius * 1.2, radius * 2.8])
-            rect.centerx = position.x
-            rect.top = position.y - radius * 2.3
-            # pygame.draw.rect(screen, "orange", rect)
-
-            pygame.draw.arc(screen, "black", rect, 0.01, math.pi)
-            end = rect.midleft
-            direction = pygame.Vector2(0, -radius / 2)
-
-            arrow_direction = direction.rotate(320)
-            pygame.draw.aaline(screen, "black", end, end + arrow_direction)
-
-            arrow_direction = direction.rotate(-320)
-            pygame.draw.aaline(screen, "black", end, end + arrow_direction)
-
-            FONT.rotation = 0
-            FONT.size = 16
-
-            surf, trect = FONT.render(char)
-            trect.midbottom = rect.midtop
-            screen.blit(surf, trect)
-
-        else:
-            middle, rot = self.draw_connection_to_pos(screen, position, other.pos)
-
-            # adjust backwards facing connections to be more "up" facing
-            if 90 < rot < 270:
-                rot = 180 + rot
-
-            FONT.rotation = rot
-
-            FONT.size = 16
-
-            surf, rect = FONT.render(char)
-            rect.topleft = (200, 200)
-
-            rect.bottomright = middle
-
-            # pygame.draw.rect(screen, "orange", rect)
-            screen.blit(surf, rect)
-
-    def draw(self, screen: pygame.Surface, offset: pygame.Vector2) -> None:
-        radius = Node.radius
-        position = self.pos + offset
-
-        if self.initial:
-            point1 = pygame.Vector2(position)
-            point1.x -= radius
-            point2 = pygame.Vector2(point1)
-            point2.x -= 15
-            point2.y += 15
-            point3 = pygame.Vector2(point1)
-            point3.x -= 15
-            point3.y -= 15
-
-            pygame.draw.polygon(screen, "blue", [point1, point2, point3])
-
-        # invalid keys is the runtime way of removing invalidated connections
-        # from deleted nodes
-        invalid_keys = []
-        # draw_dict groups them by destination node, allowing the connections
-        # to be grouped properly
-        draw_dict = defaultdict(list)
-        for char in self.connections:
-            if not self.connections[char].exists:
-                invalid_keys.append(char)
-            else:
-                draw_dict[self.connections[char]].append(char)
-
-        for key in invalid_keys:
-            del self.connections[key]
-
-        for node in draw_dict:
-            text = ", ".join(draw_dict[node])
-            self._draw_connection(screen, position, text, node)
-
-        pygame.draw.circle(screen, NODE_COLOR, position, radius)
-        pygame.draw.circle(screen, "black", position, radius, 2)
-
-        if self.final:
-            pygame.draw.circle(screen, "black", position, radius * 0.8, 2)
+    def draw(
+        self,
+        screen: pygame.Surface,
+        offset: pygame.Vector2,
+        zoom: float = 1,
+        detailed: bool = True,
+    ) -> None:
+        position = self.pos * zoom + offset
+        draw_node(
+            screen, position, NODE_COLOR, self.initial, self.final, zoom, detailed
+        )
 
 
-machine = DFA()
+machine = DFA(ResultCache(pgx.path.handle("cache/results.sqlite3")))
 
 surf = pgx.image.load("node.bmp")
 surf.set_colorkey("white")
@@ -336,6 +594,8 @@ surf = pgx.image.load("x.bmp")
 surf.set_colorkey("white")
 del_button = pgx.ui.Image(surf, (110, 5), groups=["button"])
 
+layout_button = pgx.ui.Text("Auto Layout", (160, 10), groups=["button"])
+
 welcome = pgx.ui.Text("Welcome to PyFlap!", (screen.get_width() / 2, 5))
 welcome.style.align = pygame.Vector2(0.5, 0)
 welcome.style.font_size = 26
@@ -345,7 +605,14 @@ welcome.style.font_size = 26
 info = InfoOutput()
 print = info.print
 
-testmenu = TestMenu(machine)
+testmenu = TestMenu(machine, info)
+
+minimap = Minimap(machine)
+
+simulation = SimulationMenu(machine)
+
+# the panels handle their own clicks and scrolling
+PANELS = (testmenu, minimap, simulation)
 
 mode = "free"
 connection_root = False
@@ -353,11 +620,23 @@ move_node = False
 hovered_node = False
 
 SCROLL_SPEED = 100
+SCROLL_KEYS = (pygame.K_w, pygame.K_a, pygame.K_s, pygame.K_d)
 MOUSE_HELD = False
 
+# sleep between events instead of redrawing the same frame 144 times a second
+pgx.time.set_idle(True)
+
+# whether anything on screen might have changed since the last frame, which
+# is only drawn again if so
+dirty = True
+
 while True:
     hovered_node = machine.get_node_at(pygame.mouse.get_pos())
 
+    # whatever asked to be woken up now has something to show
+    if pgx.time.woke:
+        dirty = True
+
     # The event queue is a mess, but it is the "core" of the app. It implements
     # switching between various modes that lead the user to be able to do
     # different things. It does this by dealing with MOUSEBUTTONDOWN and
@@ -367,6 +646,26 @@ while True:
             pygame.quit()
             raise SystemExit
 
+        if event.type != pygame.MOUSEMOTION:
+            dirty = True
+
+        # the mouse wheel zooms around the cursor, unless it's over a panel.
+        # pygame also reports the wheel as buttons 4 and 5, which shouldn't
+        # count as clicks
+        if event.type == pygame.MOUSEWHEEL:
+            mouse = pygame.mouse.get_pos()
+            if not any(panel.rect.collidepoint(mouse) for panel in PANELS):
+                machine.zoom_at(mouse, 1.1 ** event.y)
+            continue
+        if event.type in (pygame.MOUSEBUTTONDOWN, pygame.MOUSEBUTTONUP):
+            if event.button > 3:
+                continue
+
+        if event.type == pygame.MOUSEBUTTONDOWN and any(
+            panel.rect.collidepoint(event.pos) for panel in PANELS
+        ):
+            continue
+
         if event.type == pygame.MOUSEBUTTONDOWN:
             if mode == "place":
                 machine.add_node_at(event.pos)
@@ -396,6 +695,22 @@ while True:
             elif MOUSE_HELD and mode == "free":
                 machine.move(*event.rel)
 
+            # the mouse moving over the canvas alone changes nothing, but it
+            # drags things, draws connections, and hovers the UI and panels
+            last_pos = (event.pos[0] - event.rel[0], event.pos[1] - event.rel[1])
+            if (
+                any(event.buttons)
+                or move_node
+                or MOUSE_HELD
+                or (mode == "connect" and connection_root)
+                or any(
+                    pgx.ui.element_at(pos)
+                    or any(panel.rect.collidepoint(pos) for panel in PANELS)
+                    for pos in (event.pos, last_pos)
+                )
+            ):
+                dirty = True
+
         if event.type == pygame.MOUSEBUTTONUP:
             if mode == "connect" and connection_root:
                 connection = hovered_node
@@ -405,6 +720,15 @@ while True:
             move_node = False
             MOUSE_HELD = False
 
+    # scrolling and layout animate, so the loop can't go idle during them
+    if (
+        any(pgx.key.is_pressed(key, invisible=True) for key in SCROLL_KEYS)
+        or machine.layout
+    ):
+        pgx.time.keep_awake()
+
+    machine.step_layout()
+
     if pgx.key.is_pressed(pygame.K_w):
         machine.move(0, -SCROLL_SPEED * pgx.time.delta_time)
     if pgx.key.is_pressed(pygame.K_s):
@@ -414,6 +738,11 @@ while True:
     if pgx.key.is_pressed(pygame.K_d):
         machine.move(SCROLL_SPEED * pgx.time.delta_time, 0)
 
+    if not dirty:
+        pgx.tick(144)
+        continue
+    dirty = False
+
     screen.fill(BG_COLOR)
 
     machine.draw(screen)
@@ -427,6 +756,10 @@ while True:
 
     testmenu.display()
 
+    minimap.display()
+
+    simulation.display()
+
     place_button.display()
     if place_button.clicked:
         mode = "place"
@@ -440,8 +773,16 @@ while True:
     if del_button.clicked:
         mode = "delete"
 
+    layout_button.display()
+    if layout_button.clicked:
+        if machine.layout:
+            machine.stop_layout()
+        else:
+            machine.start_layout()
+
     info.display()
 
-    # updates the display, limits framerate to 144 FPS
+    # updates the display, limits framerate to 144 FPS, or waits for
+    # something to happen if nothing is going on
     pygame.display.flip()
     pgx.tick(144)
@@ -1,5 +1,7 @@
 import copy
 import string
+from array import array
+from collections import OrderedDict
 from typing import Union
 
 import pygame.freetype
@@ -7,11 +9,106 @@ import pygame.freetype
 from pgx.font import font
 
 
+# Generated text shared between every Text in the process. Lots of them hold
+# the same thing (button labels, test results, the same few characters), so
+# the image and metrics are generated once and handed to all of them. The
+# least recently used entries are thrown out once they take up more than
+# max_bytes. Images from here are shared, so they shouldn't be drawn on.
+class TextCache:
+    def __init__(self, max_bytes: int = 32 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self._entries = OrderedDict()
+
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key) -> Union[tuple, None]:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self._entries.move_to_end(key)
+        return entry[1]
+
+    def put(self, key, entry, nbytes: int) -> None:
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self.nbytes -= old[0]
+
+        self._entries[key] = (nbytes, entry)
+        self.nbytes += nbytes
+
+        while self.nbytes > self.max_bytes and len(self._entries) > 1:
+            old_nbytes, _ = self._entries.popitem(last=False)[1]
+            self.nbytes -= old_nbytes
+
+    # for entries that grow after they're put in
+    def resize(self, key, entry, nbytes: int) -> None:
+        old = self._entries.get(key)
+        if old is not None and old[1] is entry and old[0] != nbytes:
+            self.put(key, entry, nbytes)
+
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self.nbytes = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+
+# What a Text comes out as, shared through the TextCache. Laying out the
+# lines only takes font measurements, the image and the glyph metrics are
+# left until something asks for them, and kept from then on.
+class _Generated:
+    __slots__ = ["key", "lines", "line_rects", "rect", "image", "metrics", "line_ends"]
+
+    def __init__(self, key, lines, line_rects, rect):
+        self.key = key
+        self.lines = lines
+        self.line_rects = line_rects
+        self.rect = rect
+
+        self.image = None
+        self.metrics = None
+        self.line_ends = None
+
+    def get_image(self, text) -> pygame.Surface:
+        if self.image is None:
+            self.image = text._render(self)
+            Text.cache.resize(self.key, self, self.nbytes())
+        return self.image
+
+    def get_glyph_metrics(self, text) -> array:
+        if self.metrics is None:
+            self.metrics, self.line_ends = text._measure_glyphs(self)
+            Text.cache.resize(self.key, self, self.nbytes())
+        return self.metrics
+
+    def nbytes(self) -> int:
+        nbytes = 0
+        if self.image is not None:
+            nbytes += self.image.get_width() * self.image.get_height()
+            nbytes *= self.image.get_bytesize()
+        if self.metrics is not None:
+            nbytes += self.metrics.itemsize * len(self.metrics)
+            nbytes += self.line_ends.itemsize * len(self.line_ends)
+        return nbytes
+
+
 class Text:
     # ------------------------------------------------------------------------------------------#
     #                                         ATTRIBUTES                                        #
     # ------------------------------------------------------------------------------------------#
 
+    cache = TextCache()
+
     __slots__ = (
         [
             "_text",
@@ -24,14 +121,7 @@ class Text:
             "_spacing",
             "_limit",
         ]
-        + [
-            "image",
-            "rect",
-            "metrics",
-            "metrics_byline",
-            "rect_metrics",
-            "rect_metrics_byline",
-        ]
+        + ["_generated", "_rect"]
         + ["_changed"]
     )
 
@@ -120,7 +210,7 @@ class Text:
         self.text = textstr
         self.size = size
 
-        self.font = kwargs.get("font", font.opensans)
+        self.font = kwargs["font"] if "font" in kwargs else font.opensans
         self.color = kwargs.get("color", (0, 0, 0, 255))
         self.bgcolor = kwargs.get("bgcolor", (0, 0, 0, 0))
         self.style = kwargs.get("style", pygame.freetype.STYLE_DEFAULT)
@@ -134,42 +224,76 @@ class Text:
         setattr(self, name, kwargs.get(name, getattr(Text, f"default_{name}")))
 
     def get_rect(self) -> pygame.Rect:
-        """Returns a rect from the text, rerenders the text if necessary."""
+        """Returns a rect from the text, only lays it out, nothing is rendered."""
         if self._changed:
             self._generate()
             self._changed = False
-        return self.rect
+        return self._rect
 
     def get_image(self) -> pygame.Surface:
         """Returns an image of the text, rerendering if necessary."""
         if self._changed:
             self._generate()
             self._changed = False
-        return self.image
+        return self._generated.get_image(self)
+
+    def get_lines(self) -> list:
+        """Returns the lines the text wraps into, as (string, rect) pairs."""
+        self.get_rect()
+        generated = self._generated
+        return [
+            (line, rect.copy())
+            for line, rect in zip(generated.lines, generated.line_rects)
+        ]
 
     def get_metrics(self) -> list:
-        if self._changed:
-            self._generate()
-            self._changed = False
-        return self.metrics
+        metrics = self._get_glyph_metrics()
+        return [tuple(metrics[i : i + 6]) for i in range(0, len(metrics), 6)]
 
     def get_metrics_lines(self) -> list:
-        if self._changed:
-            self._generate()
-            self._changed = False
-        return self.metrics_byline
+        metrics = self.get_metrics()
+        return [metrics[start:end] for start, end in self._get_line_spans()]
 
     def get_rect_metrics(self) -> list:
-        if self._changed:
-            self._generate()
-            self._changed = False
-        return self.rect_metrics
+        return [rect for line in self.get_rect_metrics_byline() for rect in line]
 
     def get_rect_metrics_byline(self) -> list:
+        rect_metrics_byline = []
+        for line_metrics in self.get_metrics_lines():
+            line_rects = []
+            for metric in line_metrics:
+                rect_metric = pygame.Rect(
+                    metric[0], metric[2], metric[1] - metric[0], metric[3] - metric[2]
+                )
+
+                # sets the last rect to come right up to the current rect
+                if line_rects:
+                    line_rects[-1].width = rect_metric.x - line_rects[-1].x
+
+                line_rects.append(rect_metric)
+            rect_metrics_byline.append(line_rects)
+
+        return rect_metrics_byline
+
+    image = property(get_image)
+    rect = property(get_rect)
+    lines = property(get_lines)
+    metrics = property(get_metrics)
+    metrics_byline = property(get_metrics_lines)
+    rect_metrics = property(get_rect_metrics)
+    rect_metrics_byline = property(get_rect_metrics_byline)
+
+    def _get_glyph_metrics(self) -> array:
         if self._changed:
             self._generate()
             self._changed = False
-        return self.rect_metrics_byline
+        return self._generated.get_glyph_metrics(self)
+
+    # (start, end) of each line's glyphs in the metrics
+    def _get_line_spans(self) -> list:
+        self._get_glyph_metrics()
+        line_ends = self._generated.line_ends
+        return list(zip([0, *line_ends[:-1]], line_ends))
 
     def __len__(self):
         return len(self.text)
@@ -205,143 +329,182 @@ class Text:
         return words
 
     # splits text into a list of lines, applying the limit setting
+    # Line widths are built up a word at a time rather than re-measuring the
+    # whole line for every word. Two strings put together are as wide as the
+    # two of them plus a join term for the chars either side of the seam,
+    # which takes in kerning and side bearings. Each distinct word and join
+    # is measured once, so wrapping is linear in the length of the text.
     def _split_lines(self):
-        words = self._split_words()
+        widths = {}
+
+        def width(textstr):
+            w = widths.get(textstr)
+            if w is None:
+                w = self.font.find_px_length(textstr, self.size, self.style)
+                widths[textstr] = w
+            return w
+
+        def join(left, right):
+            return width(left + right) - width(left) - width(right)
+
+        # reversed, so taking the next word off the end is cheap
+        words = self._split_words()[::-1]
 
         lines = []
-        current_line = ""
+        current_line = []
+        current_width = 0
+        last_char = ""
         while words:
-            if words[0] == "\n":
-                lines.append(current_line)
-                current_line = ""
-                del words[0]
+            word = words[-1]
+            if word == "\n":
+                lines.append("".join(current_line))
+                current_line = []
+                current_width = 0
+                last_char = ""
+                words.pop()
 
             else:
-                l = self.font.find_px_length(
-                    current_line + words[0], self.size, self.style
-                )
+                l = current_width
+                if word:
+                    l += width(word)
+                    if last_char:
+                        l += join(last_char, word[0])
 
                 # if adding this word goes over the limit...
                 if self.limit is not False and l > self.limit:
 
                     # if one word is longer than the limit on its own
-                    if current_line == "":
+                    if not current_line:
 
                         # if the word making it go over is a single character
-                        if len(words[0]) == 1:
-                            current_line += words.pop(0)
+                        if len(word) == 1:
+                            current_line.append(words.pop())
+                            current_width = l
+                            last_char = word
 
                         # otherwise atomize the current word into characters
                         else:
-                            words[0:1] = list(words[0])
+                            words.pop()
+                            words.extend(reversed(word))
 
                     # normal case
                     else:
-                        lines.append(current_line)
-                        current_line = ""
+                        lines.append("".join(current_line))
+                        current_line = []
+                        current_width = 0
+                        last_char = ""
 
                 # if there is still more room for words on this line
                 else:
-                    current_line += words.pop(0)
+                    current_line.append(words.pop())
+                    current_width = l
+                    if word:
+                        last_char = word[-1]
 
+        current_line = "".join(current_line)
         if current_line:
             lines.append(current_line)
 
         return lines
 
+    # everything about a Text that changes how it comes out
+    def _cache_key(self):
+        return (
+            self.text,
+            self.font,
+            self.size,
+            tuple(pygame.Color(self.color)),
+            tuple(pygame.Color(self.bgcolor)),
+            self.style,
+            self.align,
+            self.spacing,
+            self.limit,
+        )
+
     def _generate(self):
-        images = []
+        key = self._cache_key()
+        generated = Text.cache.get(key)
+
+        if generated is None:
+            generated = _Generated(key, *self._layout())
+            Text.cache.put(key, generated, generated.nbytes())
+
+        self._generated = generated
+
+        # the rect gets moved around by whatever owns this Text
+        self._rect = generated.rect.copy()
+
+    # where each line goes, worked out from font measurements alone
+    def _layout(self):
+        lines = self._split_lines() if self.text != "" else []
         rects = []
-        metrics = []
-        metrics_byline = []
-        rect_metrics = []
-        rect_metrics_byline = []
 
-        if self.text == "":
-            image, rect = self.font.render(
-                "", self.size, (0, 0, 0, 0), self.color, self.style
+        # an empty text still comes out as an empty line, but has no metrics
+        for line in lines or [""]:
+            rect = pygame.Rect(
+                (0, 0), self.font.get_render_size(line, self.size, self.style)
             )
-            rects.append(rect)
-            images.append(image)
-        else:
-            for line in self._split_lines():
-                image, rect = self.font.render(
-                    line, self.size, (0, 0, 0, 0), self.color, self.style
-                )
 
-                # fixes the line rects as per the spacing setting
-                if rects:
-                    rects[-1].h *= self.spacing
-                    rect.y = rects[-1].bottom
+            # fixes the line rects as per the spacing setting
+            if rects:
+                rects[-1].h *= self.spacing
+                rect.y = rects[-1].bottom
 
-                line_metrics = self.font.get_metrics(line, self.size, self.style)
-
-                rects.append(rect)
-                images.append(image)
-                metrics_byline.append(line_metrics)
-                rect_metrics_byline.append([])
+            rects.append(rect)
 
         # creating overall rectangle out of the line rectangles
-        self.rect = rects[0].unionall(rects[1:])
+        text_rect = rects[0].unionall(rects[1:])
         if self.limit is not False:
-            self.rect.w = self.limit
+            text_rect.w = self.limit
 
         # makes selectability on the final line look good
         # just trust me
         if len(rects) > 1:
             rects[-1].h *= self.spacing
 
-        # aligning the metrics
-        for i in range(len(metrics_byline)):
-            # fixes the line rects as per the align setting
-            rect = rects[i]
+        # fixes the line rects as per the align setting
+        for rect in rects[: len(lines)]:
             if self.align == "right":
-                rect.x = self.rect.w - rect.w
+                rect.x = text_rect.w - rect.w
             elif self.align == "center":
-                rect.x = self.rect.w / 2 - rect.w / 2
-
-            # fixes the metrics to the line rects
-            line_metrics = metrics_byline[i]
-            for j, metric in enumerate(line_metrics):
-                metric = (
-                    metric[0] + rect.x,
-                    metric[1] + rect.x,
-                    rect.top,
-                    rect.bottom,
-                    metric[4],
-                    metric[5],
-                )
-
-                metrics.append(metric)
-                line_metrics[j] = metric
-
-                # creates a rect version of the metrics
-                rect_metric = pygame.Rect(
-                    metric[0], metric[2], metric[1] - metric[0], metric[3] - metric[2]
-                )
-                rect_metrics.append(rect_metric)
-                rect_metrics_byline[i].append(rect_metric)
-
-                # sets the last rect to come right up to the current rect
-                try:
-                    lm = rect_metrics_byline[i][-2]
-                    lm.width = rect_metric.x - lm.x
-                except IndexError:
-                    pass
+                rect.x = text_rect.w / 2 - rect.w / 2
 
-        self.metrics = metrics
-        self.metrics_byline = metrics_byline
-        self.rect_metrics = rect_metrics
-        self.rect_metrics_byline = rect_metrics_byline
+        return lines, rects, text_rect
 
+    def _render(self, generated):
         # uses the area to create a surface to store everything on
-        surf = pygame.Surface(self.rect.size, pygame.SRCALPHA)
+        surf = pygame.Surface(generated.rect.size, pygame.SRCALPHA)
         surf.fill(self.bgcolor)
 
         # places all of the images into their correct locations
-        for rect, image in zip(rects, images):
+        for line, rect in zip(generated.lines or [""], generated.line_rects):
+            image, _ = self.font.render(
+                line, self.size, (0, 0, 0, 0), self.color, self.style
+            )
             surf.blit(image, rect)
-        self.image = surf
+
+        return surf
+
+    # the metrics of every glyph, 6 numbers each, fixed to the line rects
+    def _measure_glyphs(self, generated):
+        metrics = array("d")
+        line_ends = array("l")
+
+        for line, rect in zip(generated.lines, generated.line_rects):
+            for metric in self.font.get_metrics(line, self.size, self.style):
+                metrics.extend(
+                    (
+                        metric[0] + rect.x,
+                        metric[1] + rect.x,
+                        rect.top,
+                        rect.bottom,
+                        metric[4],
+                        metric[5],
+                    )
+                )
+            line_ends.append(len(metrics) // 6)
+
+        return metrics, line_ends
 
     # public attributes:
     # .text
@@ -1,25 +1,60 @@
-import pygame
-import pygame.freetype
+import importlib
+import sys
+import types
 
 # General utilities
 from pgx.path import path
 
 path._init()  # init pathing asap
 
-from pgx.event import event
-from pgx.time import time
-from pgx.key import key
-from pgx.File import File
-from pgx.Rect import Rect
-import pgx.image
+# Everything else is imported the first time it's used (PEP 562), so using
+# pgx.File or pgx.Rect on their own doesn't pull in pygame, its fonts or the
+# UI. name: (module, name in the module, or None for the module itself)
+_LAZY = {
+    # General utilities
+    "event": ("pgx.event", "event"),
+    "time": ("pgx.time", "time"),
+    "key": ("pgx.key", "key"),
+    "File": ("pgx.File", "File"),
+    "Rect": ("pgx.Rect", "Rect"),
+    "image": ("pgx.image", None),
+    # UI system
+    "font": ("pgx.font", "font"),
+    "Text": ("pgx.Text", "Text"),
+    "ui": ("pgx.ui", None),
+    # Experimental
+    "handle_error": ("pgx.handle_error", "handle_error"),
+}
 
-# UI system
-from pgx.font import font
-from pgx.Text import Text
-import pgx.ui
 
-# Experimental
-from pgx.handle_error import handle_error
+def __getattr__(name):
+    if name not in _LAZY:
+        raise AttributeError(f"module 'pgx' has no attribute '{name}'")
+
+    module_name, attr = _LAZY[name]
+    value = importlib.import_module(module_name)
+    if attr is not None:
+        value = getattr(value, attr)
+
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted({*globals(), *_LAZY})
+
+
+# Importing a submodule sets it on the package, which would hide the class of
+# the same name in it (pgx.time the module instead of pgx.time the class)
+class _Package(types.ModuleType):
+    def __setattr__(self, name, value):
+        if name in _LAZY and _LAZY[name][1] is not None:
+            if isinstance(value, types.ModuleType):
+                return
+        super().__setattr__(name, value)
+
+
+sys.modules[__name__].__class__ = _Package
 
 
 class VersionType(type):
@@ -41,16 +76,20 @@ __version__ = version.ver
 
 
 def init() -> None:
+    import pygame
+
     pygame.mixer.init()
     pygame.key.set_repeat(500, 20)
 
 
 def tick(*args) -> None:
+    from pgx import event, key, time, ui
+
     # fps limiter - optional
-    time._tick(*args)
+    events = time._tick(*args)
 
     # gets the event stuff updated
-    event._update()
+    event._update(events)
 
     # gets the keyboard ready to respond
     key._prepare()
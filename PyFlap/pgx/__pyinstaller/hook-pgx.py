@@ -1,3 +1,9 @@
-from PyInstaller.utils.hooks import collect_data_files
+from PyInstaller.utils.hooks import collect_data_files, collect_submodules
 
 datas = collect_data_files("pgx")
+
+# pgx imports its submodules the first time they're used, which the analysis
+# can't follow
+hiddenimports = collect_submodules(
+    "pgx", filter=lambda name: not name.startswith("pgx.__pyinstaller")
+)
@@ -20,9 +20,9 @@ class event:
 
     # called every tick by pgx.tick()
     @staticmethod
-    def _update():
+    def _update(events=()):
         event._tickevents.clear()
-        for pg_event in pygame.event.get():
+        for pg_event in [*events, *pygame.event.get()]:
             event._tickevents.append(pg_event)
 
             # left click events are given a clickcount variable to see whether
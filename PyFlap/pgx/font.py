@@ -1,27 +1,45 @@
 import math
 import string
+from collections import OrderedDict
 
 import pygame
+import pygame.freetype
 
 from pgx import image
 from pgx import path
 
 
-class font:
+# The enum fonts (font.roboto and so on) are loaded the first time each one
+# is asked for, rather than all of them when pgx is imported
+class LazyFontType(type):
+    def __getattr__(cls, name):
+        if name in cls.FONTS:
+            f = cls._load_font(name)
+        elif name == "classic":
+            f = cls._create_font_classic()
+        else:
+            raise AttributeError(f"type object 'font' has no attribute '{name}'")
+
+        setattr(cls, name, f)
+        return f
+
+
+class font(metaclass=LazyFontType):
+    # enum font stuffs
+    FONTS = (
+        "opensans",
+        "lato",
+        "montserrat",
+        "roboto",
+        "robotocondensed",
+        "sourcesanspro",
+        "fixedsys",
+    )
+
     @staticmethod
     def _init():
         pygame.freetype.init()
 
-        # enum font stuffs
-        font.opensans = font._load_font("opensans")
-        font.lato = font._load_font("lato")
-        font.montserrat = font._load_font("montserrat")
-        font.roboto = font._load_font("roboto")
-        font.robotocondensed = font._load_font("robotocondensed")
-        font.sourcesanspro = font._load_font("sourcesanspro")
-        font.fixedsys = font._load_font("fixedsys")
-        font.classic = font._create_font_classic()
-
     def _load_font(name):
         try:
             f = font.Font(path.handle(f"fonts/{name}/{name}.ttf", True))
@@ -72,21 +90,69 @@ class font:
                 self.path = path.handle(filepath)
             self._font = pygame.freetype.Font(self.path)
 
-            # used by get_metrics(), which requires setting attributes
-            # directly on the font, rather than passing them in like render()
-            self._dummy_font = pygame.freetype.Font(self.path)
+            # glyph atlases by (size, style), least recently used first
+            self._atlases = OrderedDict()
 
         # returns a tuple (image, rect)
         def render(self, textstr, size, bgcolor, color, style):
+            # translucent glyphs that overlap build up where they cross when
+            # freetype draws them, which coloring the atlas glyphs can't match
+            atlas_glyphs = None
+            if pygame.Color(color).a == 255:
+                atlas_glyphs = self._get_glyphs(textstr, size, style)
+
+            if atlas_glyphs is None:
+                return self._render_freetype(textstr, size, bgcolor, color, style)
+
+            atlas, glyphs = atlas_glyphs
+            positions, left, width = self._lay_out(glyphs)
+
+            surf = pygame.Surface(
+                (width if width != 0 else 1, size + 4), pygame.SRCALPHA
+            )
+            surf.fill(bgcolor)
+
+            atlas_surface = atlas.get_surface(color)
+            blits = []
+            for (area, rect, advance), pen in zip(glyphs, positions):
+                if area.w:
+                    dest = (round(pen) - left + rect.x, atlas.baseline - rect.y)
+                    blits.append((atlas_surface, dest, area))
+            surf.blits(blits, doreturn=False)
+
+            return surf, surf.get_rect()
+
+        # lays glyphs out the way freetype does, the text starts at the leftmost
+        # ink and runs to the furthest ink or, for trailing whitespace, the pen.
+        # Returns the pen position of each glyph, the left edge and the width
+        @staticmethod
+        def _lay_out(glyphs):
+            positions = []
+            left = right = 0
+            pen = 0
+            for area, rect, advance in glyphs:
+                x = pen + rect.x
+                end = x + rect.w if rect.w else pen + advance
+                if positions:
+                    left = min(left, x)
+                    right = max(right, end)
+                else:
+                    left, right = x, end
+                positions.append(pen)
+                pen += advance
+
+            left = round(left)
+            return positions, left, round(right) - left
+
+        # the whole string rasterized by freetype, what render() falls back on
+        def _render_freetype(self, textstr, size, bgcolor, color, style):
             calc_size = self._font.get_rect(textstr, size=size, style=style)
 
             metrics = self.get_metrics(textstr, size, style)
             if metrics:
                 maxh = max([m[3] for m in metrics])
-                minh = min([m[2] for m in metrics])
             else:
                 maxh = 0
-                minh = 0
 
             y = size - maxh + self._font.get_sized_descender(size) + 4
 
@@ -98,10 +164,7 @@ class font:
             # render_to() returns a rect, but that rect is not used.
             self._font.render_to(
                 surf,
-                (
-                    0,
-                    y,
-                ),
+                (0, y),
                 textstr,
                 fgcolor=color,
                 size=size,
@@ -110,10 +173,58 @@ class font:
 
             return surf, surf.get_rect()
 
-        def get_metrics(self, textstr, size, style):
-            self._dummy_font.style = style
+        # styles that change the spacing or draw across the whole string,
+        # strings in these are rendered by freetype directly
+        UNATLASED_STYLES = (
+            pygame.freetype.STYLE_STRONG
+            | pygame.freetype.STYLE_UNDERLINE
+            | pygame.freetype.STYLE_WIDE
+        )
+
+        # how many sizes and styles keep an atlas at once
+        MAX_ATLASES = 8
+
+        # the GlyphAtlas render() draws strings at this size and style from,
+        # or None if they're rendered by freetype directly
+        def get_atlas(self, size, style):
+            if style == pygame.freetype.STYLE_DEFAULT:
+                style = self._font.style
+            if style & self.UNATLASED_STYLES:
+                return None
+
+            key = (size, style)
+            atlas = self._atlases.get(key)
+            if atlas is None:
+                atlas = font.GlyphAtlas(self._font, size, style)
+                self._atlases[key] = atlas
+                if len(self._atlases) > self.MAX_ATLASES:
+                    self._atlases.popitem(last=False)
+            else:
+                self._atlases.move_to_end(key)
+
+            return atlas
 
-            m = self._dummy_font.get_metrics(textstr, size)
+        # returns the atlas and the (atlas area, rect, advance) of each glyph
+        # in textstr, or None if the string has to be rendered by freetype
+        def _get_glyphs(self, textstr, size, style):
+            atlas = self.get_atlas(size, style)
+            if atlas is None:
+                return None
+
+            # if the atlas fills up partway through, the areas found before
+            # that point are gone, so the string is tried once more
+            for _ in range(2):
+                clears = atlas.clears
+                glyphs = [atlas.get(char) for char in textstr]
+                if None in glyphs:
+                    return None
+                if atlas.clears == clears:
+                    return atlas, glyphs
+
+            return None
+
+        def get_metrics(self, textstr, size, style):
+            m = self._get_ft_metrics(self._font, textstr, size, style)
 
             # patch trailing whitespace not being appreciated
             if textstr and textstr[-1] == " ":
@@ -130,7 +241,7 @@ class font:
                         for i, metric in enumerate(m)
                     ]
                 )
-                m = self._dummy_font.get_metrics(textstr, size)
+                m = self._get_ft_metrics(self._font, textstr, size, style)
 
             if m:
                 prev_x = -m[0][0]
@@ -148,8 +259,27 @@ class font:
 
             return m
 
+        # freetype's get_metrics() only goes by the style set on the font, rather
+        # than taking it like render() does, so it's set just for the call
+        @staticmethod
+        def _get_ft_metrics(ft_font, textstr, size, style):
+            ft_style = ft_font.style
+            ft_font.style = style
+            metrics = ft_font.get_metrics(textstr, size)
+            ft_font.style = ft_style
+            return metrics
+
         def find_px_length(self, textstr, size, style):
-            return self._font.get_rect(textstr, size=size, style=style).w
+            atlas_glyphs = self._get_glyphs(textstr, size, style)
+            if atlas_glyphs is None:
+                return self._font.get_rect(textstr, size=size, style=style).w
+
+            return self._lay_out(atlas_glyphs[1])[2]
+
+        # the size of the surface render() makes, without rendering anything
+        def get_render_size(self, textstr, size, style):
+            width = self.find_px_length(textstr, size, style)
+            return (width if width != 0 else 1, size + 4)
 
         # for some reason freetype font instances can't be automatically copied with copy.deepcopy()
         # this is my mitigation
@@ -165,6 +295,100 @@ class font:
         def __str__(self):
             return f"pgx.font.Font: {self._font.name}"
 
+    # The glyphs of a font at one size and style, each rasterized once in white
+    # and packed into rows on a single surface. Font.render() puts strings
+    # together by blitting from a copy of it in the text color, the last few
+    # colors used are kept. When a new glyph doesn't fit, everything is
+    # thrown out and packing starts over, clears counts how often that happens.
+    class GlyphAtlas:
+        MAX_COLORS = 4
+
+        def __init__(self, ft_font, size, style):
+            self.ft_font = ft_font
+            self.size = size
+            self.style = style
+
+            # the baseline sits at the same height for every string at a size
+            self.baseline = size + ft_font.get_sized_descender(size) + 4
+
+            side = max(512, math.ceil(size) * 16)
+            self.surface = pygame.Surface((side, side), pygame.SRCALPHA)
+            self.clears = -1
+            self.clear()
+
+        def clear(self):
+            self.surface.fill((255, 255, 255, 0))
+            self.colored = OrderedDict()
+            self.glyphs = {}
+            self.clears += 1
+
+            # the row being filled, and where in it the next glyph goes
+            self.row_y = 0
+            self.row_height = 0
+            self.x = 0
+
+        # the atlas with its glyphs in an opaque color
+        def get_surface(self, color):
+            color = tuple(pygame.Color(color))
+
+            surface = self.colored.get(color)
+            if surface is None:
+                surface = self.surface.copy()
+                surface.fill(color, special_flags=pygame.BLEND_RGBA_MULT)
+                self.colored[color] = surface
+                if len(self.colored) > self.MAX_COLORS:
+                    self.colored.popitem(last=False)
+            else:
+                self.colored.move_to_end(color)
+
+            return surface
+
+        # returns (atlas area, rect relative to the pen, advance), or None
+        # for characters the font doesn't have
+        def get(self, char):
+            glyph = self.glyphs.get(char)
+            if glyph is None and char not in self.glyphs:
+                glyph = self._add(char)
+                self.glyphs[char] = glyph
+            return glyph
+
+        def _add(self, char):
+            metrics = font.Font._get_ft_metrics(
+                self.ft_font, char, self.size, self.style
+            )
+            if not metrics or metrics[0] is None:
+                return None
+
+            rect = self.ft_font.get_rect(char, size=self.size, style=self.style)
+            side = self.surface.get_width()
+            if rect.w > side or rect.h > side:
+                return None
+
+            if self.x + rect.w > side:
+                self.row_y += self.row_height
+                self.row_height = 0
+                self.x = 0
+            if self.row_y + rect.h > side:
+                self.clear()
+
+            area = pygame.Rect(self.x, self.row_y, rect.w, rect.h)
+            if rect.w:
+                surfaces = [((255, 255, 255), self.surface), *self.colored.items()]
+                for color, surface in surfaces:
+                    self.ft_font.render_to(
+                        surface,
+                        area,
+                        char,
+                        fgcolor=color,
+                        size=self.size,
+                        style=self.style,
+                    )
+
+            self.x += rect.w
+            self.row_height = max(self.row_height, rect.h)
+
+            return area, rect, metrics[0][4]
+
     # class that allows you to create pixelart fonts from images relatively easy
     class CustomFont(Font):
         # char_images = {"char": pygame.Surface, "char": (pygame.Surface, custom width)}
@@ -176,6 +400,17 @@ class font:
             self.image_color = current_color
             self.gap = gap
 
+            self.is_setup = False
+
+            # scaled char images by size, and those recolored by (size, color),
+            # least recently used first
+            self._sizes = OrderedDict()
+            self._colored = OrderedDict()
+
+        # how many sizes, and sizes in each color, are kept at once
+        MAX_SIZES = 8
+        MAX_COLORED = 16
+
         # the meat of the __init__, automatically called on demand b/c pgx.init comes before
         # video init so can't do surface operations.
         def _setup(self):
@@ -202,7 +437,8 @@ class font:
                 except:
                     self.char_images[char] = (im.convert_alpha(), im.get_width())
 
-            self.cached = (self.image_size, self.char_images.copy(), self.gap)
+            self._sizes[self.image_size] = (self.char_images.copy(), self.gap)
+            self.is_setup = True
 
         # returns a tuple (image, rect)
         def render(self, textstr, size, bgcolor, color, style):
@@ -211,18 +447,24 @@ class font:
             surf = pygame.Surface((width if width != 0 else 1, size), pygame.SRCALPHA)
             surf.fill(bgcolor)
 
-            _, font_chars, gap = self.cached
+            font_chars, gap = self._get_size(size)
+            colored = self._get_colored(size, color)
             text = self._process_text(textstr)
 
+            blits = []
             x = 0
             for char in text:
-                # turning the scaled character image to the right color
-                char_im = pygame.PixelArray(font_chars[char][0].copy())
-                char_im.replace(self.image_color, color)
-                char_im = char_im.make_surface()
-
-                surf.blit(char_im, (x, 0))
+                char_im = colored.get(char)
+                if char_im is None:
+                    # turning the scaled character image to the right color
+                    char_im = pygame.PixelArray(font_chars[char][0].copy())
+                    char_im.replace(self.image_color, color)
+                    char_im = char_im.make_surface()
+                    colored[char] = char_im
+
+                blits.append((char_im, (x, 0)))
                 x += font_chars[char][1] + gap
+            surf.blits(blits, doreturn=False)
 
             return surf, surf.get_rect()
 
@@ -230,10 +472,7 @@ class font:
             # (min_x, max_x, min_y, max_y, horizontal_advance_x, horizontal_advance_y)
             # only imitates what is used later on (for now)
 
-            if self.cached[0] != size:
-                self._resize_images(size)
-
-            _, font_chars, gap = self.cached
+            font_chars, gap = self._get_size(size)
             text = self._process_text(textstr)
 
             metrics = []
@@ -250,16 +489,10 @@ class font:
 
         # part of the common font standard
         def find_px_length(self, textstr, size, style):
-            if not getattr(self, "cached", False):
-                self._setup()
-
             if textstr == "":
                 return 0
 
-            if self.cached[0] != size:
-                self._resize_images(size)
-
-            _, font_chars, gap = self.cached
+            font_chars, gap = self._get_size(size)
             text = self._process_text(textstr)
 
             length = font_chars[text.pop(0)][1]
@@ -268,6 +501,46 @@ class font:
 
             return length
 
+        # part of the common font standard
+        def get_render_size(self, textstr, size, style):
+            width = math.ceil(self.find_px_length(textstr, size, style))
+            return (width if width != 0 else 1, size)
+
+        # part of the common font standard, pixel fonts don't use an atlas
+        def get_atlas(self, size, style):
+            return None
+
+        # returns the char images and gap at a size, scaling them if they aren't kept
+        def _get_size(self, size):
+            if not self.is_setup:
+                self._setup()
+
+            scaled = self._sizes.get(size)
+            if scaled is None:
+                scaled = self._resize_images(size)
+                self._sizes[size] = scaled
+                if len(self._sizes) > self.MAX_SIZES:
+                    self._sizes.popitem(last=False)
+            else:
+                self._sizes.move_to_end(size)
+
+            return scaled
+
+        # the recolored char images at a size, filled in as chars get rendered
+        def _get_colored(self, size, color):
+            key = (size, tuple(pygame.Color(color)))
+
+            colored = self._colored.get(key)
+            if colored is None:
+                colored = {}
+                self._colored[key] = colored
+                if len(self._colored) > self.MAX_COLORED:
+                    self._colored.popitem(last=False)
+            else:
+                self._colored.move_to_end(key)
+
+            return colored
+
         # scales all of the character images and puts them in a place to be accessed
         def _resize_images(self, size):
             scalar = size / self.image_size
@@ -278,7 +551,7 @@ class font:
                 width = self.char_images[char][1] * scalar
                 scaled_images[char] = (im, width)
 
-            self.cached = (size, scaled_images, self.gap * scalar)
+            return scaled_images, self.gap * scalar
 
         # takes a string, returns char list. any characters not in font are told to use "missing"
         def _process_text(self, textstr):
@@ -1,3 +1,5 @@
+import math
+
 import pygame.time
 
 """
@@ -20,11 +22,52 @@ class time:
     _last_ticks = 0
     loops = 0
 
+    # idle mode: rather than spinning at the fps limit, tick() sleeps until
+    # there's an event or until the earliest wake up time requested during
+    # the frame. Time spent asleep doesn't count towards delta_time.
+    idle = False
+    _wake_ticks = None
+
+    # whether the last tick got to the wake up time asked for, so whatever
+    # asked has something to do. Always true when not idle. A wake up time
+    # that wasn't got to, because an event came first, still stands.
+    woke = True
+
+    # returns the events it had to take off the queue to find out whether
+    # there was anything to do, which are handed on to pgx.event
     @staticmethod
-    def _tick(*args):
+    def _tick(*args) -> list:
+        slept = 0
+        events = []
+        if time.idle:
+            events = pygame.event.get()
+
+        if time.idle and not events:
+            timeout = None
+            if time._wake_ticks is not None:
+                timeout = time._wake_ticks - pygame.time.get_ticks()
+
+            if timeout is None or timeout > 0:
+                start = pygame.time.get_ticks()
+                if timeout is None:
+                    pg_event = pygame.event.wait()
+                else:
+                    # wait() only takes whole milliseconds
+                    pg_event = pygame.event.wait(max(1, math.ceil(timeout)))
+                slept = pygame.time.get_ticks() - start
+
+                if pg_event.type != pygame.NOEVENT:
+                    events.append(pg_event)
+
+        time.woke = not time.idle or (
+            time._wake_ticks is not None and pygame.time.get_ticks() >= time._wake_ticks
+        )
+        if time.woke:
+            time._wake_ticks = None
+
         time.clock.tick(*args)
 
-        delta_ticks = pygame.time.get_ticks() - time._last_ticks
+        delta_ticks = pygame.time.get_ticks() - time._last_ticks - slept
         time._last_ticks = pygame.time.get_ticks()
         time.delta_time = delta_ticks / 1000 * time.time_scale
 
@@ -33,6 +76,29 @@ class time:
 
         time.loops += 1
 
+        return events
+
+    @staticmethod
+    def set_idle(idle: bool) -> None:
+        """Lets tick() sleep until something happens, instead of busy looping."""
+        time.idle = idle
+
+    @staticmethod
+    def wake_at(ticks: int) -> None:
+        """Makes sure the next idle tick returns by ticks (pygame.time.get_ticks)."""
+        if time._wake_ticks is None or ticks < time._wake_ticks:
+            time._wake_ticks = ticks
+
+    @staticmethod
+    def wake_in(ms: int) -> None:
+        """Makes sure the next idle tick returns within ms milliseconds."""
+        time.wake_at(pygame.time.get_ticks() + ms)
+
+    @staticmethod
+    def keep_awake() -> None:
+        """Stops the next tick from sleeping, for while things are animating."""
+        time.wake_at(0)
+
     @staticmethod
     def get_loops() -> int:
         """The number of times the program has gone through the game loop."""
@@ -2,6 +2,7 @@ import numbers
 import json
 
 import pygame
+import pygame.freetype
 
 import pgx
 from pgx.File import WrappedSequence
@@ -39,7 +40,8 @@ class Backend:
 
     # DEFAULT SCREEN HANDLING
 
-    screen = None
+    # pgx.ui is imported on first use, which can be after the screen is made
+    screen = pygame.display.get_surface()
 
     # monkey patch set_mode() to guarantee UI always has current screen surface
     _pygame_set_mode = pygame.display.set_mode
@@ -51,10 +53,23 @@ class Backend:
 
     pygame.display.set_mode = _pgx_set_mode
 
+    # ELEMENTS ON SCREEN
+
+    # the elements displayed since the last tick, and in the last tick that
+    # displayed any, in the order they were drawn
+    _displayed = []
+    displayed = []
+
     # TICK SPECIFIC HANDLING
 
     @staticmethod
     def _tick():
+        # a frame that wasn't drawn leaves the screen, and cursor, as they were
+        if not Backend._displayed:
+            return
+        Backend.displayed = Backend._displayed
+        Backend._displayed = []
+
         if Backend.cursor_requested:
             Backend._pygame_set_cursor(Backend.cursor_requested)
         else:
@@ -320,6 +335,14 @@ class StyleManager(Style):
         return style, regenerate
 
 
+def element_at(pos):
+    """The element on top at pos in the last frame drawn, or None."""
+    for element in reversed(Backend.displayed):
+        if element.margin_rect.collidepoint(pos):
+            return element
+    return None
+
+
 def _group_cb(groups, element):
     element._update_style_manager()
 
@@ -388,6 +411,7 @@ class Element:
 
         if not self.style_dict["display"]:
             return
+        Backend._displayed.append(self)
 
         if self.REGENERATE or style_regen:  # style_regen triggers first generation
             self._generate()
@@ -467,8 +491,10 @@ class Text(Element):
         x = y = self.style_dict["margin"] * style["scale"]
         self._text_surf.blit(self._textobj.get_image(), (x, y))
 
+    # the surface can be bigger than the element, an Input grows it in place
     def _elem_display(self, screen):
-        screen.blit(self._text_surf, self.margin_rect.topleft)
+        area = pygame.Rect((0, 0), self.margin_rect.size)
+        screen.blit(self._text_surf, self.margin_rect.topleft, area)
 
     def _get_text(self):
         return self._text
@@ -507,17 +533,123 @@ class ChangesTracker:
         return self.values[self.index]
 
 
+# The last line of an Input's text, drawn a glyph at a time from the font's
+# GlyphAtlas, the same way Font.render() draws it. Characters can be put on or
+# taken off the end without laying out or drawing the rest of the line again.
+# push() and pop() return the columns that changed, as (start, stop), or None
+# if the line no longer comes out the same as rendering it in one go would.
+class _TypedLine:
+    def __init__(self, atlas, color, height):
+        self.atlas = atlas
+        self.color = color
+        self.surface = pygame.Surface((1, height), pygame.SRCALPHA)
+
+        # (char, pen, dest, width, ink start, ink end, furthest right dest)
+        # of each glyph, the last three taken over the glyphs up to it
+        self.glyphs = []
+        self.pen = 0
+        self.left = 0  # where the ink starts, set by the first glyph
+        self.width = 0
+
+    def push(self, chars):
+        old_width = self.width
+        start = old_width
+        for char in chars:
+            glyph = self.atlas.get(char)
+            if glyph is None:
+                return None
+            area, rect, advance = glyph
+
+            x = self.pen + rect.x
+            end = x + rect.w if rect.w else self.pen + advance
+            if self.glyphs:
+                *_, ink_start, ink_end, right = self.glyphs[-1]
+                ink_start = min(ink_start, x)
+                ink_end = max(ink_end, end)
+                if round(ink_start) != self.left:
+                    return None
+            else:
+                ink_start, ink_end, right = x, end, 0
+                self.left = round(x)
+
+            dest = (round(self.pen) - self.left + rect.x, self.atlas.baseline - rect.y)
+            right = max(right, dest[0] + rect.w)
+            self.glyphs.append(
+                (char, self.pen, dest, rect.w, ink_start, ink_end, right)
+            )
+            start = min(start, dest[0])
+            self.pen += advance
+
+        return self._redraw(start, max(old_width, right))
+
+    def pop(self, count):
+        old_width = self.width
+        start = old_width
+        stop = max(old_width, self.glyphs[-1][-1])
+        for _ in range(count):
+            char, self.pen, dest, *_ = self.glyphs.pop()
+            start = min(start, dest[0])
+
+        if not self.glyphs or round(self.glyphs[-1][4]) != self.left:
+            return None
+
+        return self._redraw(start, stop)
+
+    # clears the columns and draws every glyph reaching into them again, in
+    # order, so where glyphs overlap they blend just as they did before
+    def _redraw(self, start, stop):
+        ink_end = self.glyphs[-1][5]
+        self.width = round(ink_end) - self.left
+        if self.width == 0:
+            return None
+
+        start = max(start, 0)
+        if stop > self.surface.get_width():
+            self._grow(stop)
+
+        height = self.surface.get_height()
+        columns = pygame.Rect(start, 0, stop - start, height)
+        self.surface.fill((0, 0, 0, 0), columns)
+        self.surface.set_clip(columns.clip((0, 0, self.width, height)))
+
+        i = len(self.glyphs)
+        while i and self.glyphs[i - 1][-1] > start:
+            i -= 1
+
+        for char, pen, dest, width, *_ in self.glyphs[i:]:
+            if width and dest[0] + width > start:
+                area = self.atlas.get(char)[0]
+                atlas_surface = self.atlas.get_surface(self.color)
+                self.surface.blit(atlas_surface, dest, area)
+
+        self.surface.set_clip(None)
+        return start, stop
+
+    def _grow(self, width):
+        surface = pygame.Surface(
+            (max(width, self.surface.get_width() * 2), self.surface.get_height()),
+            pygame.SRCALPHA,
+        )
+        # adding onto a clear surface copies the pixels as they are
+        surface.blit(self.surface, (0, 0), special_flags=pygame.BLEND_RGBA_ADD)
+        self.surface = surface
+
+
 class Input(Text):
     def __init__(self, string, location, **kwargs):
         super().__init__(string, location, **kwargs)
 
+        # what's being typed into, None when the text has to be regenerated
+        self._line = None
+        self._scratch = None
+
         self.length_limit = False
         # needs to be updated by set_text() as well
         self.changes = ChangesTracker(self._text)
         self.allowed_chars = False
 
         self.blink_time = 0.7
-        self.blink_timer = 0
+        self.blink_ticks = 0  # when the caret next toggles
         self.blink = False
 
     def _elem_display(self, screen):
@@ -525,7 +657,6 @@ class Input(Text):
             super()._elem_display(screen)
             return
 
-        self.blink_timer += pgx.time.delta_time
         for event in pgx.key.get_text_input_events():
             char = event.unicode
             mod = event.mod
@@ -572,16 +703,22 @@ class Input(Text):
             if event.key == pygame.K_RETURN:
                 self.selected = False
 
+            # the new text is only built on the next display, so that frame
+            # has to come without waiting on another event
             if regen:
                 self.REGENERATE = True
+                pgx.time.keep_awake()
 
         if self.changes.see_current() != self._text:
             self.changes.add(self._text)
 
         super()._elem_display(screen)
-        if self.blink_timer > self.blink_time:
-            self.blink_timer = 0
+        # goes off the clock, as delta_time skips time spent idle
+        now = pygame.time.get_ticks()
+        if now >= self.blink_ticks:
+            self.blink_ticks = now + int(self.blink_time * 1000)
             self.blink = not self.blink
+        pgx.time.wake_at(self.blink_ticks)
 
         if self.blink:
             blink = pygame.Surface((2, self.rect.h))
@@ -594,6 +731,196 @@ class Input(Text):
         super()._set_text(text)
         self.changes.add(self._text)
 
+    # typing only changes the end of the text, so rather than laying it all
+    # out and drawing it again, just the end of it is changed where it can be
+    def _elem_generate(self):
+        if not self._type_into_line():
+            super()._elem_generate()
+            self._start_line()
+
+    def _start_line(self):
+        self._line = None
+
+        style = self.style_dict
+        textobj = self._textobj
+        lines = textobj.get_lines()
+        if not lines or "\n" in self._text or pygame.Color(style["color"]).a != 255:
+            return
+        if textobj.limit is not False and textobj.align != "left":
+            return
+        # closer together than that, the line images overlap
+        if textobj.spacing < 1:
+            return
+
+        # where each line starts in the text, and its height in the image
+        self._line_starts = []
+        self._line_ys = []
+        start = 0
+        for text, rect in lines:
+            self._line_starts.append(start)
+            self._line_ys.append(rect.y)
+            start += len(text)
+
+        self._line = self._new_line(lines[-1][0])
+        self._line_from = (style, pygame.Vector2(self.location), self._text)
+
+    def _new_line(self, text):
+        textobj = self._textobj
+        atlas = textobj.font.get_atlas(textobj.size, textobj.style)
+        if atlas is None:
+            return None
+
+        line = _TypedLine(atlas, textobj.color, int(textobj.size + 4))
+        if line.push(text) is None:
+            return None
+        return line
+
+    def _type_into_line(self):
+        line = self._line
+        if line is None:
+            return False
+        self._line = None
+
+        style, location, old_text = self._line_from
+        if style != self.style_dict or location != self.location:
+            return False
+
+        text = self._text
+        limit = self._textobj.limit
+        last = len(self._line_starts) - 1
+        if len(text) > len(old_text) and text.startswith(old_text):
+            columns = line.push(text[len(old_text) :])
+            if columns is not None and (limit is False or line.width <= limit):
+                self._redraw_columns(line, *columns)
+            elif limit is not False:
+                line = self._rewrap(last)
+            else:
+                return False
+
+        elif len(text) < len(old_text) and old_text.startswith(text):
+            if self._keeps_break(last):
+                columns = line.pop(len(old_text) - len(text))
+                if columns is None:
+                    return False
+                self._redraw_columns(line, *columns)
+            else:
+                # from the last line whose break stays put, at worst the first
+                i = last - 1
+                while i > 0 and not self._keeps_break(i):
+                    i -= 1
+                if i < 0 or self._line_starts[i] >= len(text):
+                    return False
+                line = self._rewrap(i)
+
+        else:
+            return False
+
+        if line is None:
+            return False
+
+        self._textobj.text = text
+        self._line = line
+        self._line_from = (style, location, text)
+        return True
+
+    # whether taking characters off the end of the text leaves the break before
+    # a line where it is, with some of the line left after it. The break is
+    # decided by the line's first word, so that has to be left whole. A break
+    # in the middle of a word splits one too long for a line, and it still is
+    # while it reaches past the break.
+    def _keeps_break(self, i):
+        text = self._text
+        start = self._line_starts[i]
+        if start >= len(text):
+            return False
+        if start == 0:
+            return True
+
+        whitespace = pgx.Text.WHITESPACE
+        if text[start] in whitespace or text[start - 1] not in whitespace:
+            return True
+        return any(char in whitespace for char in text[start + 1 :])
+
+    # lays out the text from line i on by itself, for when typing moves a
+    # line break, and puts it in place of those lines
+    def _rewrap(self, i):
+        style = self.style_dict
+        y = self._line_ys[i]
+        start = self._line_starts[i]
+
+        block = self._textobj.copy()
+        block.text = self._text[start:]
+        lines = block.get_lines()
+
+        del self._line_starts[i:]
+        del self._line_ys[i:]
+        for text, rect in lines:
+            self._line_starts.append(start)
+            self._line_ys.append(y + rect.y)
+            start += len(text)
+
+        bottom = y + block.get_rect().h
+
+        old_bottom = self.size.y
+        self.size = pygame.Vector2(self.size.x, bottom)
+        self._make_rect()
+        self._fit_surface(self.margin_rect.size)
+
+        x = margin = style["margin"] * style["scale"]
+        rows = pygame.Rect(0, margin + y, self._text_surf.get_width(), 0)
+        rows.h = max(bottom, old_bottom) - y
+        self._text_surf.fill(style["bgcolor"], rows)
+        self._text_surf.blit(block.get_image(), (x, margin + y))
+
+        return self._new_line(lines[-1][0])
+
+    # grows the text surface to at least size, keeping what's on it
+    def _fit_surface(self, size):
+        old_w, old_h = self._text_surf.get_size()
+        w, h = size
+        if w <= old_w and h <= old_h:
+            return
+
+        w = old_w if w <= old_w else max(w, old_w * 2)
+        h = old_h if h <= old_h else max(h, old_h * 2)
+        surface = pygame.Surface((w, h), pygame.SRCALPHA)
+        # adding onto a clear surface copies the pixels as they are
+        surface.blit(self._text_surf, (0, 0), special_flags=pygame.BLEND_RGBA_ADD)
+
+        bgcolor = self.style_dict["bgcolor"]
+        surface.fill(bgcolor, (old_w, 0, w - old_w, h))
+        surface.fill(bgcolor, (0, old_h, old_w, h - old_h))
+        self._text_surf = surface
+
+    # puts columns of the last line back onto the text surface the way
+    # ui.Text draws it, the line onto a clear pgx.Text image, that onto the
+    # background
+    def _redraw_columns(self, line, start, stop):
+        if self._textobj.limit is False:
+            self.size = pygame.Vector2(line.width, self.size.y)
+            self._make_rect()
+            self._fit_surface(self.margin_rect.size)
+
+        style = self.style_dict
+        x = y = style["margin"] * style["scale"]
+        y += self._line_ys[-1]
+        columns = pygame.Rect(start, 0, stop - start, line.surface.get_height())
+
+        scratch = self._scratch
+        if (
+            scratch is None
+            or scratch.get_width() < columns.w
+            or scratch.get_height() < columns.h
+        ):
+            scratch = pygame.Surface(columns.size, pygame.SRCALPHA)
+            self._scratch = scratch
+        else:
+            scratch.fill((0, 0, 0, 0), ((0, 0), columns.size))
+
+        scratch.blit(line.surface, (0, 0), columns)
+        self._text_surf.fill(style["bgcolor"], ((x + start, y), columns.size))
+        self._text_surf.blit(scratch, (x + start, y), ((0, 0), columns.size))
+
 
 class Image(Element):
     def __init__(self, surface, location, **kwargs):
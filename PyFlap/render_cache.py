@@ -0,0 +1,110 @@
+from collections import OrderedDict
+
+import pygame
+import pygame.freetype
+
+# Rendering text through freetype is the most expensive part of drawing a
+# machine, and connection labels hardly ever change between frames. This
+# keeps rendered labels around, keyed by everything that affects the pixels,
+# and throws out the least recently used ones past max_entries. A label whose
+# text or angle changes just misses and gets rendered fresh.
+
+
+class LabelCache:
+    def __init__(self, font: pygame.freetype.Font, max_entries: int = 4096):
+        self.font = font
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+
+        self.hits = 0
+        self.misses = 0
+
+    def render(
+        self, text: str, rotation: int, size: int, color
+    ) -> (pygame.Surface, pygame.Rect):
+        """Returns a (surface, rect) like freetype's render, the rect is a copy."""
+        key = (text, rotation % 360, size, tuple(pygame.Color(color)))
+
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            entry = self.font.render(text, color, rotation=rotation, size=size)
+            self._entries[key] = entry
+            if len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        else:
+            self.hits += 1
+            self._entries.move_to_end(key)
+
+        surf, rect = entry
+        return surf, rect.copy()
+
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+# Keeps the static part of the screen (the machine) on its own surface, so it
+# only has to be drawn again when it changes. Panning scrolls the pixels that
+# are already there and only draws the strips uncovered at the edges.
+# draw_func(surface, offset, area) must draw everything that lands in area.
+
+
+class CachedLayer:
+    def __init__(self, draw_func, bgcolor):
+        self.draw_func = draw_func
+        self.bgcolor = bgcolor
+
+        self.surface = None
+        self.offset = None
+        self.key = None
+
+    def invalidate(self) -> None:
+        self.key = None
+
+    def draw(self, screen: pygame.Surface, offset, key) -> None:
+        """Blits the layer, rerendering whatever is out of date for key and offset."""
+        # whole pixel offsets, so scrolled pixels line up with redrawn ones
+        offset = (round(offset[0]), round(offset[1]))
+        size = screen.get_size()
+
+        if self.surface is None or self.surface.get_size() != size:
+            self.surface = pygame.Surface(size, 0, screen)
+            self.key = None
+
+        if key != self.key:
+            self._render(self.surface.get_rect(), offset)
+
+        elif offset != self.offset:
+            w, h = size
+            dx = offset[0] - self.offset[0]
+            dy = offset[1] - self.offset[1]
+
+            if abs(dx) >= w or abs(dy) >= h:
+                self._render(self.surface.get_rect(), offset)
+            else:
+                self.surface.scroll(dx, dy)
+                if dx > 0:
+                    self._render(pygame.Rect(0, 0, dx, h), offset)
+                elif dx < 0:
+                    self._render(pygame.Rect(w + dx, 0, -dx, h), offset)
+                if dy > 0:
+                    self._render(pygame.Rect(0, 0, w, dy), offset)
+                elif dy < 0:
+                    self._render(pygame.Rect(0, h + dy, w, -dy), offset)
+
+        self.key = key
+        self.offset = offset
+        screen.blit(self.surface, (0, 0))
+
+    def _render(self, area: pygame.Rect, offset) -> None:
+        self.surface.set_clip(area)
+        self.surface.fill(self.bgcolor, area)
+        self.draw_func(self.surface, pygame.Vector2(offset), area)
+        self.surface.set_clip(None)
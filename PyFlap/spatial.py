@@ -0,0 +1,66 @@
+import math
+
+# Uniform grid over the canvas for finding nodes by position. Every state id
+# is bucketed by the cell its center falls in. With cells at least as wide as
+# a node, a point lookup only has to look at the 2x2 block of cells around
+# the point, no matter how many nodes there are.
+
+
+class SpatialGrid:
+    def __init__(self, cell_size: float):
+        self.cell_size = cell_size
+        self.cells = {}  # (cx, cy): {id, ...}
+
+    def _cell(self, pos) -> (int, int):
+        return (
+            math.floor(pos[0] / self.cell_size),
+            math.floor(pos[1] / self.cell_size),
+        )
+
+    def insert(self, i: int, pos) -> None:
+        self.cells.setdefault(self._cell(pos), set()).add(i)
+
+    def remove(self, i: int, pos) -> None:
+        cell = self._cell(pos)
+        bucket = self.cells[cell]
+        bucket.discard(i)
+        if not bucket:
+            del self.cells[cell]
+
+    def rebuild(self, ids, positions) -> None:
+        """Replaces the contents with ids at positions, for when everything moved."""
+        self.cells = {}
+        cells = (positions // self.cell_size).astype(int).tolist()
+        for i, cell in zip(ids.tolist(), cells):
+            self.cells.setdefault(tuple(cell), set()).add(i)
+
+    def move(self, i: int, old_pos, new_pos) -> None:
+        if self._cell(old_pos) != self._cell(new_pos):
+            self.remove(i, old_pos)
+            self.insert(i, new_pos)
+
+    def query(self, left: float, top: float, right: float, bottom: float) -> list:
+        """Returns the ids in every cell overlapping the area, a superset of hits."""
+        cx1, cy1 = self._cell((left, top))
+        cx2, cy2 = self._cell((right, bottom))
+
+        # big areas are cheaper to answer by going through the occupied cells
+        if (cx2 - cx1 + 1) * (cy2 - cy1 + 1) > len(self.cells):
+            return [
+                i
+                for (cx, cy), bucket in self.cells.items()
+                if cx1 <= cx <= cx2 and cy1 <= cy <= cy2
+                for i in bucket
+            ]
+
+        found = []
+        for cx in range(cx1, cx2 + 1):
+            for cy in range(cy1, cy2 + 1):
+                bucket = self.cells.get((cx, cy))
+                if bucket:
+                    found.extend(bucket)
+        return found
+
+    def query_point(self, pos, radius: float) -> list:
+        x, y = pos
+        return self.query(x - radius, y - radius, x + radius, y + radius)
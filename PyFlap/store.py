@@ -0,0 +1,233 @@
+import json
+from collections.abc import MutableMapping
+
+import numpy as np
+
+# Struct-of-arrays storage for a machine's states. Each state is an integer id
+# that indexes into every array, rather than a Python object of its own:
+#   positions   - float32 (capacity, 2) canvas positions
+#   flags       - uint8 (capacity,) bit field of EXISTS / INITIAL / FINAL
+#   transitions - int32 (capacity, symbols) target ids, NO_TRANSITION if unset
+# Symbols get a column the first time they're used. The arrays double in size
+# as they fill up, so adding states is amortized O(1).
+# Every transition is also recorded in a reverse index keyed by its target, so
+# deleting a state can drop the edges into it in O(degree), and its id can be
+# handed out again.
+
+
+class MachineStore:
+    EXISTS = 1
+    INITIAL = 2
+    FINAL = 4
+
+    NO_TRANSITION = -1
+
+    def __init__(self, capacity: int = 64):
+        self.positions = np.zeros((capacity, 2), np.float32)
+        self.flags = np.zeros(capacity, np.uint8)
+        self.transitions = np.full((capacity, 4), self.NO_TRANSITION, np.int32)
+
+        self.symbols = []
+        self.symbol_index = {}
+
+        # target id -> {(source id, column), ...}
+        self.incoming = {}
+
+        # ids below count have been handed out, the deleted ones wait in _free
+        self.count = 0
+        self._free = []
+
+    def __len__(self):
+        return int(np.count_nonzero(self.flags[: self.count] & self.EXISTS))
+
+    def ids(self) -> np.ndarray:
+        """Returns the ids of every existing state."""
+        return np.flatnonzero(self.flags[: self.count] & self.EXISTS)
+
+    def add_state(self, pos) -> int:
+        if self._free:
+            i = self._free.pop()
+        else:
+            if self.count == len(self.flags):
+                self._grow_rows()
+            i = self.count
+            self.count += 1
+
+        self.positions[i] = pos
+        self.flags[i] = self.EXISTS
+        self.transitions[i] = self.NO_TRANSITION
+        return i
+
+    def remove_state(self, i: int) -> None:
+        """Removes a state along with every transition into or out of it."""
+        row = self.transitions[i]
+        for column in np.flatnonzero(row != self.NO_TRANSITION):
+            self.incoming[int(row[column])].discard((i, int(column)))
+
+        for source, column in self.incoming.pop(i, ()):
+            self.transitions[source, column] = self.NO_TRANSITION
+
+        self.flags[i] = 0
+        self.transitions[i] = self.NO_TRANSITION
+        self._free.append(i)
+
+    def set_transition(self, i: int, symbol: str, target: int) -> None:
+        column = self.symbol_column(symbol)
+        self.clear_transition(i, column)
+        self.transitions[i, column] = target
+        self.incoming.setdefault(target, set()).add((i, column))
+
+    def clear_transition(self, i: int, column: int) -> None:
+        target = int(self.transitions[i, column])
+        if target != self.NO_TRANSITION:
+            self.transitions[i, column] = self.NO_TRANSITION
+            self.incoming[target].discard((i, column))
+
+    def exists(self, i: int) -> bool:
+        return bool(self.flags[i] & self.EXISTS)
+
+    def get_flag(self, i: int, flag: int) -> bool:
+        return bool(self.flags[i] & flag)
+
+    def set_flag(self, i: int, flag: int, value: bool) -> None:
+        if value:
+            self.flags[i] |= flag
+        else:
+            self.flags[i] &= ~flag & 0xFF
+
+    def symbol_column(self, symbol: str) -> int:
+        """Returns the column for symbol, creating one if it's new."""
+        column = self.symbol_index.get(symbol)
+        if column is None:
+            column = len(self.symbols)
+            if column == self.transitions.shape[1]:
+                self._grow_columns()
+            self.symbols.append(symbol)
+            self.symbol_index[symbol] = column
+        return column
+
+    def edge_labels(self) -> dict:
+        """Returns {(source, target): label}, the chars between two states joined."""
+        transitions = self.transitions[: self.count, : len(self.symbols)]
+        sources, columns = np.nonzero(transitions != self.NO_TRANSITION)
+        targets = transitions[sources, columns]
+
+        grouped = {}
+        for source, column, target in zip(
+            sources.tolist(), columns.tolist(), targets.tolist()
+        ):
+            grouped.setdefault((source, target), []).append(self.symbols[column])
+
+        return {key: ", ".join(chars) for key, chars in grouped.items()}
+
+    # Machines are saved as JSON, with states numbered in id order:
+    #   {"states": [{"pos": [x, y], "initial": bool, "final": bool}, ...],
+    #    "transitions": [[source, symbol, target], ...]}
+    def to_dict(self) -> dict:
+        ids = self.ids()
+        number = {int(i): n for n, i in enumerate(ids)}
+
+        states = [
+            {
+                "pos": [float(x), float(y)],
+                "initial": self.get_flag(i, self.INITIAL),
+                "final": self.get_flag(i, self.FINAL),
+            }
+            for i, (x, y) in zip(ids.tolist(), self.positions[ids].tolist())
+        ]
+
+        transitions = self.transitions[: self.count, : len(self.symbols)]
+        sources, columns = np.nonzero(transitions != self.NO_TRANSITION)
+        targets = transitions[sources, columns]
+        edges = [
+            [number[source], self.symbols[column], number[target]]
+            for source, column, target in zip(
+                sources.tolist(), columns.tolist(), targets.tolist()
+            )
+        ]
+
+        return {"states": states, "transitions": edges}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "MachineStore":
+        store = cls(max(64, len(data["states"])))
+        for state in data["states"]:
+            i = store.add_state(state["pos"])
+            store.set_flag(i, cls.INITIAL, state.get("initial", False))
+            store.set_flag(i, cls.FINAL, state.get("final", False))
+
+        for source, symbol, target in data["transitions"]:
+            store.set_transition(source, symbol, target)
+        return store
+
+    def save(self, filepath: str) -> None:
+        with open(filepath, "w") as f:
+            json.dump(self.to_dict(), f)
+
+    @classmethod
+    def load(cls, filepath: str) -> "MachineStore":
+        with open(filepath) as f:
+            return cls.from_dict(json.load(f))
+
+    def _grow_rows(self):
+        capacity = len(self.flags) * 2
+
+        positions = np.zeros((capacity, 2), np.float32)
+        positions[: self.count] = self.positions
+        self.positions = positions
+
+        flags = np.zeros(capacity, np.uint8)
+        flags[: self.count] = self.flags
+        self.flags = flags
+
+        transitions = np.full(
+            (capacity, self.transitions.shape[1]), self.NO_TRANSITION, np.int32
+        )
+        transitions[: self.count] = self.transitions
+        self.transitions = transitions
+
+    def _grow_columns(self):
+        rows, columns = self.transitions.shape
+        transitions = np.full((rows, columns * 2), self.NO_TRANSITION, np.int32)
+        transitions[:, :columns] = self.transitions
+        self.transitions = transitions
+
+
+# Dictionary-like access to one state's row of the transition table, in the
+# {char: Node} shape the rest of PyFlap expects.
+class Connections(MutableMapping):
+    __slots__ = ("node",)
+
+    def __init__(self, node):
+        self.node = node
+
+    def __getitem__(self, char):
+        store = self.node.store
+        column = store.symbol_index.get(char)
+        if column is None:
+            raise KeyError(char)
+        target = store.transitions[self.node.id, column]
+        if target == store.NO_TRANSITION:
+            raise KeyError(char)
+        return self.node.__class__(store, int(target))
+
+    def __setitem__(self, char, other):
+        self.node.store.set_transition(self.node.id, char, other.id)
+
+    def __delitem__(self, char):
+        store = self.node.store
+        column = store.symbol_index.get(char)
+        if column is None or store.transitions[self.node.id, column] < 0:
+            raise KeyError(char)
+        store.clear_transition(self.node.id, column)
+
+    def __iter__(self):
+        store = self.node.store
+        row = store.transitions[self.node.id, : len(store.symbols)]
+        for column in np.flatnonzero(row != store.NO_TRANSITION):
+            yield store.symbols[column]
+
+    def __len__(self):
+        store = self.node.store
+        row = store.transitions[self.node.id, : len(store.symbols)]
+        return int(np.count_nonzero(row != store.NO_TRANSITION))
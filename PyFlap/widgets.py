@@ -1,3 +1,8 @@
+import math
+import os
+import threading
+
+import numpy as np
 import pygame
 
 import pgx
@@ -19,7 +24,6 @@ class NodeMenu:
 
         self.node = node
 
-        self.offset = machine.offset  # reference to machine offset
         self.machine = machine
 
         self.rect = pygame.Rect(0, 0, *surf.get_size())
@@ -30,7 +34,7 @@ class NodeMenu:
         self.active = True
 
     def display(self):
-        self.rect.midbottom = self.node.pos + self.offset
+        self.rect.midbottom = self.machine.to_screen(self.node.pos)
         self.rect.y -= 10
         self.location = pygame.Vector2(self.rect.topleft)
 
@@ -53,7 +57,7 @@ class NodeMenu:
         self.fincheck.display()
 
         if self.fincheck.clicked:
-            self.node.final = not self.fincheck.checked
+            self.machine.set_node_final(self.node, not self.fincheck.checked)
 
         self.fintext.set_position(self.location + pygame.Vector2(25, 30))
         self.fintext.display()
@@ -64,12 +68,22 @@ class NodeMenu:
                     self.active = False
 
 
+# A scrollable list of test inputs. There can be thousands of them, but only
+# the rows in view get widgets, which are handed the test at their position
+# whenever the list scrolls. A text file dropped onto the window is loaded as
+# one input per line. Tests run on a background thread, filling in results
+# as they come, so the UI keeps going.
 class TestMenu:
-    def __init__(self, machine):
-        width = 185
+    N_ROWS = 6
+    ROW_HEIGHT = 30
+    CHUNK = 256  # tests run per batch on the worker
+
+    def __init__(self, machine, info):
+        width = 200
         height = 300
 
         location = pygame.Vector2(pygame.display.get_surface().get_width() - width, 150)
+        self.rect = pygame.Rect(location, (width, height))
 
         surf = pygame.Surface((width, height))
         surf.fill("grey")
@@ -90,60 +104,484 @@ class TestMenu:
         self.inputs = []
         self.outputs = []
         self.routputs = []
-        n_spaces = 6
-        for n in range(n_spaces):
+        for n in range(self.N_ROWS):
+            y = 50 + n * self.ROW_HEIGHT
             input_box = pgx.ui.Input(
-                "", location + pygame.Vector2(5, 50 + n * 30), groups=["iobox"]
+                "", location + pygame.Vector2(5, y), groups=["iobox"]
             )
             input_box.style.text_width = 70
             self.inputs.append(input_box)
 
             output_box = pgx.ui.Text(
-                "", location + pygame.Vector2(80, 50 + n * 30), groups=["iobox"]
+                "", location + pygame.Vector2(80, y), groups=["iobox"]
             )
             output_box.style.text_width = 40
             self.outputs.append(output_box)
 
             routput_box = pgx.ui.Text(
-                "", location + pygame.Vector2(130, 50 + n * 30), groups=["iobox"]
+                "", location + pygame.Vector2(130, y), groups=["iobox"]
             )
             routput_box.style.text_width = 40
             self.routputs.append(routput_box)
 
+        self.scrollbar = pygame.Rect(
+            location + pygame.Vector2(width - 12, 50),
+            (8, self.N_ROWS * self.ROW_HEIGHT - 5),
+        )
+        self.scrolling = False
+
         self.test_button = pgx.ui.Text(
             "Run Tests", location + pygame.Vector2(10, 260), groups=["button"]
         )
+        self.status = pgx.ui.Text("", location + pygame.Vector2(100, 263))
+        self.status.style.font_size = 16
 
         self.machine = machine
+        self.info = info  # the on-screen print
+
+        # every test, and its (in L, reverse in L) result or None
+        self.walks = [""] * self.N_ROWS
+        self.results = [None] * self.N_ROWS
+        self.first = 0  # index of the test in the top row
+
+        # the run in progress on the worker thread
+        self.stop_event = threading.Event()
+        self.done = 0
+        self.total = 0
+        self.version = None  # of the machine being tested
+
+    def load(self, filepath: str) -> None:
+        """Replaces the tests with the lines of a text file."""
+        with open(filepath, encoding="utf-8") as f:
+            walks = f.read().splitlines()
+
+        self.stop()
+        # an empty row to add another test in, and enough to fill the rows
+        self.walks = walks + [""] * max(1, self.N_ROWS - len(walks))
+        self.results = [None] * len(self.walks)
+        self.status.text = f"{len(walks)} tests"
+        self.scroll_to(0)
+
+    def scroll_to(self, first: int) -> None:
+        self.first = max(0, min(first, len(self.walks) - self.N_ROWS))
+        for n, input_box in enumerate(self.inputs):
+            input_box.selected = False  # it's about to hold a different test
+            input_box.text = self.walks[self.first + n]
+
+    def run_tests(self) -> None:
+        self.stop()
+        if not self.machine.check_initial():
+            return
+
+        walks = list(self.walks)
+        self.results = [None] * len(walks)
+        self.done = 0
+        self.total = len(walks)
+        self.version = self.machine.version
+        self.stop_event = threading.Event()
+
+        worker = threading.Thread(
+            target=self._work,
+            args=(self.machine.compile(), walks, self.results, self.stop_event),
+            daemon=True,
+        )
+        worker.start()
+
+    def stop(self) -> None:
+        self.stop_event.set()
+        if self.total:
+            self.status.text = "stopped"
+            self.total = 0
+
+    # runs on the worker thread, with its own connection to the result cache
+    def _work(self, compiled, walks, results, stop_event):
+        cache = self.machine.cache.clone() if self.machine.cache else None
+        try:
+            for start in range(0, len(walks), self.CHUNK):
+                if stop_event.is_set():
+                    return
+
+                chunk = walks[start : start + self.CHUNK]
+                batch = chunk + ["".join(reversed(walk)) for walk in chunk]
+                verdicts = self.machine.test_all(batch, compiled, cache)
+
+                for n, walk in enumerate(chunk):
+                    i = start + n
+                    # unless it was edited while it was being tested
+                    if i < len(self.walks) and self.walks[i] == walk:
+                        results[i] = (verdicts[n], verdicts[len(chunk) + n])
+                self.done = start + len(chunk)
+        finally:
+            if cache:
+                cache.close()
 
     def display(self):
+        # results for a machine that's since changed are just wrong
+        if self.total and self.version != self.machine.version:
+            self.stop()
+
+        for event in pgx.event.get():
+            if event.type == pygame.DROPFILE:
+                # anything can be dropped on the window, keep the tests if it
+                # isn't a text file
+                try:
+                    self.load(event.file)
+                except (OSError, UnicodeDecodeError):
+                    self.info.print(
+                        f"Can't load tests from {os.path.basename(event.file)}"
+                    )
+
+            if event.type == pygame.MOUSEWHEEL:
+                if self.rect.collidepoint(pygame.mouse.get_pos()):
+                    self.scroll_to(self.first - event.y)
+
+            if event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:
+                if self.scrollbar.collidepoint(event.pos):
+                    self.scrolling = True
+            if event.type == pygame.MOUSEBUTTONUP and event.button == 1:
+                self.scrolling = False
+
+        if self.scrolling:
+            y = pygame.mouse.get_pos()[1] - self.scrollbar.top
+            self.scroll_to(round(y / self.scrollbar.height * len(self.walks)))
+
         self.background.display()
 
         self.title.display()
         self.headings.display()
 
-        for input_box in self.inputs:
+        screen = pygame.display.get_surface()
+        for n in range(self.N_ROWS):
+            i = self.first + n
+            input_box = self.inputs[n]
+
+            # long inputs wrap, only their first line fits in the row
+            y = self.rect.top + 50 + n * self.ROW_HEIGHT
+            screen.set_clip((self.rect.left, y, self.rect.width, self.ROW_HEIGHT - 2))
             input_box.display()
+            screen.set_clip(None)
+
+            if input_box.text != self.walks[i]:
+                self.walks[i] = input_box.text
+                self.results[i] = None
+                # always an empty row at the end to add another test in
+                if self.walks[-1]:
+                    self.walks.append("")
+                    self.results.append(None)
+
+            result = self.results[i]
+            text, rtext = ("", "") if result is None else map(str, result)
+            # setting text rerenders it, so only when it changes
+            if self.outputs[n].text != text:
+                self.outputs[n].text = text
+            if self.routputs[n].text != rtext:
+                self.routputs[n].text = rtext
 
-        for output_box in self.outputs:
-            output_box.display()
+            self.outputs[n].display()
+            self.routputs[n].display()
 
-        for routput_box in self.routputs:
-            routput_box.display()
+        self._draw_scrollbar(screen)
 
         self.test_button.display()
         if self.test_button.clicked:
-            for i in range(len(self.inputs)):
-                input_box = self.inputs[i]
-                # if input_box.text:
-                output = self.machine.test(input_box.text)
-                output_box = self.outputs[i]
-                output_box.text = str(output)
+            self.run_tests()
+
+        if self.total:
+            if self.done < self.total:
+                self.status.text = f"{self.done}/{self.total}"
+                # redraw now and then as results come in
+                pgx.time.wake_in(100)
+            else:
+                self.status.text = f"{self.total} tested"
+                self.total = 0
+        self.status.display()
+
+    def _draw_scrollbar(self, screen):
+        pygame.draw.rect(screen, "white", self.scrollbar)
+
+        thumb = self.scrollbar.copy()
+        thumb.height = max(10, thumb.height * self.N_ROWS // len(self.walks))
+        spare = len(self.walks) - self.N_ROWS
+        if spare:
+            thumb.y += (self.scrollbar.height - thumb.height) * self.first // spare
+        pygame.draw.rect(screen, "black", thumb)
+
+
+# A small overview of the whole machine in the corner, with a rectangle
+# showing what's on screen. Clicking it moves the view there.
+class Minimap:
+    def __init__(self, machine):
+        screen = pygame.display.get_surface()
+        width = 185
+        height = 150
+        self.padding = 6
+
+        location = pygame.Vector2(
+            screen.get_width() - width, screen.get_height() - height
+        )
+        self.rect = pygame.Rect(location, (width, height))
+
+        self.surface = pygame.Surface((width, height), 0, screen)
+        self.surface.fill("grey")
+        self.background = pgx.ui.Image(self.surface, location)
+        self.background.style.border = True
+        self.background.style.cursor = pygame.SYSTEM_CURSOR_ARROW
+
+        self.machine = machine
+
+        # maps canvas coordinates to minimap coordinates, set by _render
+        self.origin = pygame.Vector2()
+        self.scale = 1
+        self.geometry_version = None
+
+    # draws a pixel for every node, scaled to fit, only when nodes have moved
+    def _render(self):
+        store = self.machine.store
+        positions = store.positions[store.ids()]
+
+        self.surface.fill("grey")
+        if len(positions):
+            low = positions.min(axis=0)
+            span = positions.max(axis=0) - low
+            inner = np.array(self.rect.size) - self.padding * 2
+            self.scale = float(np.min(inner / np.maximum(span, 1)))
+
+            # centers the machine in the minimap
+            self.origin = pygame.Vector2(*low) - pygame.Vector2(
+                *(inner / self.scale - span) / 2
+            )
+
+            points = (positions - np.array(self.origin, np.float32)) * self.scale
+            points = points.astype(np.intp) + self.padding
+
+            color = self.surface.map_rgb(pygame.Color("black"))
+            pixels = pygame.surfarray.pixels2d(self.surface)
+            pixels[points[:, 0], points[:, 1]] = color
+            del pixels  # unlocks the surface
+
+        self.background.surface = self.surface
+        self.geometry_version = self.machine.geometry_version
+
+    def to_minimap(self, pos) -> pygame.Vector2:
+        return (
+            (pygame.Vector2(pos) - self.origin) * self.scale
+            + pygame.Vector2(self.padding)
+            + self.rect.topleft
+        )
+
+    def to_canvas(self, pos) -> pygame.Vector2:
+        return (
+            pygame.Vector2(pos) - self.rect.topleft - pygame.Vector2(self.padding)
+        ) / self.scale + self.origin
+
+    def display(self):
+        if self.geometry_version != self.machine.geometry_version:
+            self._render()
+
+        self.background.display()
+
+        screen = pygame.display.get_surface()
+        topleft = self.to_minimap(self.machine.to_world((0, 0)))
+        bottomright = self.to_minimap(self.machine.to_world(screen.get_size()))
+        viewport = pygame.Rect(topleft, bottomright - topleft).clip(self.rect)
+        if viewport:
+            pygame.draw.rect(screen, "red", viewport, 1)
+
+        for event in pgx.event.get():
+            if event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:
+                if self.rect.collidepoint(event.pos):
+                    self.jump_to(self.to_canvas(event.pos))
+
+    # centers the view on pos, in canvas coordinates
+    def jump_to(self, pos) -> None:
+        screen = pygame.display.get_surface()
+        center = pygame.Vector2(screen.get_size()) / 2
+        self.machine.offset.update(center - pygame.Vector2(pos) * self.machine.zoom)
+
+
+# Steps through a recorded run of the machine on the canvas. The run is
+# played at a chosen speed, or scrubbed through by dragging along the bar.
+class SimulationMenu:
+    def __init__(self, machine):
+        screen = pygame.display.get_surface()
+        width = 520
+        height = 70
+
+        location = pygame.Vector2(
+            (screen.get_width() - width) / 2, screen.get_height() - height
+        )
+        self.rect = pygame.Rect(location, (width, height))
+
+        surf = pygame.Surface((width, height))
+        surf.fill("grey")
+        self.background = pgx.ui.Image(surf, location)
+        self.background.style.border = True
+        self.background.style.cursor = pygame.SYSTEM_CURSOR_ARROW
+
+        self.input = pgx.ui.Input(
+            "", location + pygame.Vector2(10, 8), groups=["iobox"]
+        )
+        self.input.style.text_width = 120
 
-                rev = "".join(reversed(list(input_box.text)))
-                routput = self.machine.test(rev)
-                routput_box = self.routputs[i]
-                routput_box.text = str(routput)
+        def button(text, x):
+            return pgx.ui.Text(
+                text, location + pygame.Vector2(x, 10), groups=["button"]
+            )
+
+        self.simulate_button = button("Simulate", 150)
+        self.back_button = button("<", 235)
+        self.play_button = button("Play", 258)
+        self.forward_button = button(">", 305)
+        self.slower_button = button("-", 340)
+        self.faster_button = button("+", 470)
+
+        self.speed_text = pgx.ui.Text("", location + pygame.Vector2(365, 12))
+        self.speed_text.style.font_size = 16
+
+        self.bar = pygame.Rect(location + pygame.Vector2(10, 45), (300, 14))
+        self.status = pgx.ui.Text("", location + pygame.Vector2(320, 43))
+        self.status.style.font_size = 16
+
+        self.machine = machine
+
+        self.trace = None
+        self.state_ids = None
+        self.version = None  # of the machine the trace was recorded on
+        self.step = 0
+
+        self.playing = False
+        self.speed = 4  # steps per second
+        self.step_ticks = None  # pygame ticks when playing took the last step
+        self.scrubbing = False
+
+    def start(self, walk: str) -> None:
+        self.trace = self.machine.trace(walk)
+        if self.trace:
+            self.state_ids = self.machine.compile().state_ids
+            self.version = self.machine.version
+            self.playing = True
+            self.step_ticks = None
+            self.set_step(0)
+
+    def stop(self) -> None:
+        self.trace = None
+        self.playing = False
+        self.machine.highlight = None
+        self.status.text = ""
+
+    def set_step(self, step: int) -> None:
+        trace = self.trace
+        self.step = min(max(step, 0), len(trace) - 1)
+
+        # states below 0 mean the machine had no transition to follow
+        state = trace.state_at(self.step)
+        if state < 0:
+            self.machine.highlight = None
+            status = "stuck"
+        else:
+            node = int(self.state_ids[state])
+            edge = None
+            if self.step:
+                previous = trace.state_at(self.step - 1)
+                if previous >= 0:
+                    edge = (int(self.state_ids[previous]), node)
+            self.machine.highlight = (node, edge)
+            status = f"read {trace.walk[self.step - 1]!r}" if self.step else "start"
+
+        if self.step == len(trace) - 1:
+            status = "accepted" if trace.accepted else "rejected"
+        self.status.text = f"{self.step}/{len(trace) - 1} {status}"
+
+        # the canvas has to be redrawn to show it
+        pgx.time.keep_awake()
+
+    def display(self):
+        # a trace is only any good for the machine it was recorded on
+        if self.trace and self.version != self.machine.version:
+            self.stop()
+
+        self.background.display()
+        self.input.display()
+
+        self.simulate_button.display()
+        if self.simulate_button.clicked:
+            self.start(self.input.text)
+
+        self.back_button.display()
+        self.play_button.display()
+        self.forward_button.display()
+        self.slower_button.display()
+        self.faster_button.display()
+
+        if self.slower_button.clicked:
+            self.speed = max(self.speed / 2, 0.5)
+        if self.faster_button.clicked:
+            self.speed = min(self.speed * 2, 64)
+        self.speed_text.text = f"{self.speed:g} steps/s"
+        self.speed_text.display()
+
+        if self.trace:
+            self._update()
+        else:
+            self.playing = False
+
+        self.play_button.text = "Pause" if self.playing else "Play"
+
+        screen = pygame.display.get_surface()
+        pygame.draw.rect(screen, "white", self.bar)
+        if self.trace and len(self.trace) > 1:
+            done = self.bar.copy()
+            done.width = round(self.bar.width * self.step / (len(self.trace) - 1))
+            pygame.draw.rect(screen, "red", done)
+        pygame.draw.rect(screen, "black", self.bar, 1)
+
+        self.status.display()
+
+    def _update(self):
+        if self.back_button.clicked:
+            self.playing = False
+            self.set_step(self.step - 1)
+        if self.forward_button.clicked:
+            self.playing = False
+            self.set_step(self.step + 1)
+
+        if self.play_button.clicked:
+            self.playing = not self.playing
+            if self.playing and self.step == len(self.trace) - 1:
+                self.set_step(0)
+            self.step_ticks = None
+
+        for event in pgx.event.get():
+            if event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:
+                if self.bar.collidepoint(event.pos):
+                    self.scrubbing = True
+                    self.playing = False
+            if event.type == pygame.MOUSEBUTTONUP and event.button == 1:
+                self.scrubbing = False
+
+        if self.scrubbing:
+            x = pygame.mouse.get_pos()[0] - self.bar.left
+            step = round(x / self.bar.width * (len(self.trace) - 1))
+            if step != self.step:
+                self.set_step(step)
+
+        if self.playing:
+            # goes off the clock, as delta_time skips time spent asleep
+            now = pygame.time.get_ticks()
+            if self.step_ticks is None:
+                self.step_ticks = now
+
+            interval = 1000 / self.speed
+            steps = int((now - self.step_ticks) // interval)
+            if steps:
+                self.step_ticks += steps * interval
+                self.set_step(self.step + steps)
+
+            if self.step == len(self.trace) - 1:
+                self.playing = False
+            else:
+                # sleeps until the next step is due
+                pgx.time.wake_at(math.ceil(self.step_ticks + interval))
 
 
 class InfoOutput:
@@ -161,6 +599,9 @@ class InfoOutput:
     def display(self) -> None:
         if pygame.time.get_ticks() - self.last_input_time > self.screen_time:
             self.screen_out.text = ""
+        elif self.screen_out.text:
+            # wake up an idle loop in time to clear the message
+            pgx.time.wake_at(self.last_input_time + self.screen_time + 1)
 
         self.screen_out.display()
 
@@ -9,7 +9,19 @@ a = Analysis(
     pathex=[],
     binaries=[],
     datas=[("pgx/fonts/roboto/*", "pgx/fonts/roboto")],
-    hiddenimports=[],
+    # pgx imports these the first time they're used, see _LAZY in pgx/__init__.py
+    hiddenimports=[
+        "pgx.event",
+        "pgx.time",
+        "pgx.key",
+        "pgx.File",
+        "pgx.Rect",
+        "pgx.image",
+        "pgx.font",
+        "pgx.Text",
+        "pgx.ui",
+        "pgx.handle_error",
+    ],
     hookspath=[],
     hooksconfig={},
     runtime_hooks=[],
@@ -0,0 +1,106 @@
+import multiprocessing
+import sys
+import weakref
+from multiprocessing import resource_tracker, shared_memory
+
+import numpy as np
+
+from automaton import CompiledDFA
+
+# Fans machine testing out to worker processes. The compiled transition table
+# is copied into a shared memory segment once, and the workers map it straight
+# into numpy arrays, rather than each one unpickling its own copy.
+#
+# The process that publishes a table owns the segment. It is unlinked on
+# close(), when the SharedDFA is garbage collected, at interpreter exit, and,
+# if the owner crashes outright, by multiprocessing's resource tracker.
+# Workers only ever attach, so they must never unlink (or be tracked).
+
+
+def _unlink(shm):
+    shm.close()
+    try:
+        shm.unlink()
+    except FileNotFoundError:
+        pass
+
+
+class SharedDFA:
+    def __init__(self, compiled: CompiledDFA):
+        table_bytes = compiled.table.nbytes
+        # shared memory segments can't be empty
+        size = max(1, table_bytes + compiled.finals.nbytes)
+
+        self._shm = shared_memory.SharedMemory(create=True, size=size)
+        self._finalizer = weakref.finalize(self, _unlink, self._shm)
+
+        table = np.ndarray(compiled.table.shape, np.int32, self._shm.buf)
+        table[:] = compiled.table
+        finals = np.ndarray(compiled.finals.shape, bool, self._shm.buf, table_bytes)
+        finals[:] = compiled.finals
+        del table, finals  # views would keep the buffer from closing
+
+        # everything a worker needs to attach, small and cheap to pickle
+        self.spec = (self._shm.name, compiled.alphabet, compiled.table.shape)
+
+    def close(self) -> None:
+        self._finalizer()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+def attach(spec) -> (CompiledDFA, shared_memory.SharedMemory):
+    """Maps a published table zero-copy, the segment must outlive the machine."""
+    name, alphabet, shape = spec
+
+    if sys.version_info >= (3, 13):
+        shm = shared_memory.SharedMemory(name, track=False)
+    else:
+        # older versions register attachments with the resource tracker too,
+        # which would unlink the segment out from under the owner. Forked
+        # workers share the owner's tracker, so unregistering afterwards isn't
+        # safe either, the registration has to be skipped.
+        register = resource_tracker.register
+        resource_tracker.register = lambda *args: None
+        try:
+            shm = shared_memory.SharedMemory(name)
+        finally:
+            resource_tracker.register = register
+
+    table = np.ndarray(shape, np.int32, shm.buf)
+    finals = np.ndarray(shape[:1], bool, shm.buf, table.nbytes)
+    return CompiledDFA(alphabet, table, finals), shm
+
+
+# per worker process state, set up once by the pool initializer
+_worker_machine = None
+_worker_shm = None
+
+
+def _init_worker(spec):
+    global _worker_machine, _worker_shm
+    _worker_machine, _worker_shm = attach(spec)
+
+
+def _test_chunk(walks):
+    return [_worker_machine.test(walk) for walk in walks]
+
+
+def test_parallel(compiled: CompiledDFA, walks: list, processes=None) -> list:
+    """Tests walks across a pool of worker processes sharing one table."""
+    if not walks:
+        return []
+
+    processes = processes or multiprocessing.cpu_count()
+    chunksize = max(1, len(walks) // (processes * 4))
+    chunks = [walks[i : i + chunksize] for i in range(0, len(walks), chunksize)]
+
+    with SharedDFA(compiled) as shared:
+        with multiprocessing.Pool(processes, _init_worker, (shared.spec,)) as pool:
+            results = pool.map(_test_chunk, chunks)
+
+    return [verdict for chunk in results for verdict in chunk]